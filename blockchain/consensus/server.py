@@ -6,6 +6,8 @@ from queue import Queue
 import random
 from core.transaction import HoldStakeTransaction, UploadTransaction, DownloadTransaction, Transaction, create_transaction
 from core.chain.block import Block
+from core.stream import MessageStream, encode_message
+from core.logger import setup_logger
 
 import json
 import logging
@@ -27,7 +29,7 @@ class Server():
             
             if len(Server.blocks) != 0: 
                 lastBlock       = Server.blocks[-1]
-                Server.logger.info(f"Last block loaded --data: {lastBlock}")
+                Server.logger.debug("Last block loaded --data: %s", lastBlock)
                 lastHash        = lastBlock["__header"]["blockHash"]
                 lastBlockNumber = lastBlock["__header"]["blockNumber"]
                 
@@ -47,7 +49,7 @@ class Server():
 
             block = Block(header=header, payload=payload)
             self.__block = block
-            Server.logger.info(f"Staged block {block.serialize()}")
+            Server.logger.debug("Staged block %s", block)
         
         def add_transaction(self, transaction: Transaction) -> None:
             transaction.fee     = 1
@@ -97,7 +99,7 @@ class Server():
                     for validator in next_validators_pool:
                         self.__block.add_next_validators(ip=validator.port, port=validator.port, id=validator.peer_id)
 
-                    Server.logger.info(f"Start block emission thread: --block: {self.__block.serialize()}")
+                    Server.logger.debug("Start block emission thread: --block: %s", self.__block)
                     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                     address = (Server.configuration["blockchain"]["data"]["ip"], Server.configuration["blockchain"]["data"]["port"])
                     thread = Server.EmitBlockToDataLayerThread(block=self.__block, sock=sock, address=address)
@@ -119,7 +121,7 @@ class Server():
                 super().__init__()
                 
             def run(self) -> None: 
-                Server.logger.info(f"Getting last block validator --blocks: {Server.blocks}")
+                Server.logger.debug("Getting last block validator --blocks: %s", Server.blocks)
                 if (len(Server.blocks) == 0):
                     ## logic for when its empty
                     ## we will contact every peer asking for the current validator, 
@@ -132,7 +134,7 @@ class Server():
                 else:
                     block = Server.blocks[-1]
                     Server.validators = block.get("__header")["nextValidators"]
-                    Server.logger.info(f"Next validators are: {Server.validators} on block: {block}")
+                    Server.logger.debug("Next validators are: %s on block: %s", Server.validators, block)
                     keys = list(Server.validators.keys())
                     is_validator = self.__peer_id in keys
                     Server.logger.info(f"--is_validator: {is_validator} --peer_id: {self.__peer_id} --keys: {keys}")
@@ -155,7 +157,7 @@ class Server():
         def __init__(self) -> None:
             super().__init__()
             self.__data_address = (Server.configuration["blockchain"]["data"]["ip"], Server.configuration["blockchain"]["data"]["port"])
-            self.__encoded_message_data = json.dumps({"message_type": 4}).encode(globals.ENCODING)
+            self.__encoded_message_data = encode_message({"message_type": 4})
             
         def run(self) -> None:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -163,7 +165,7 @@ class Server():
             sock.connect(self.__data_address)
             sock.sendall(self.__encoded_message_data)
             bin = sock.recv(4024)
-            Server.logger.info(f"Received from blockchain-chunk request: {bin}")
+            Server.logger.debug("Received from blockchain-chunk request: %s", bin)
             data = json.loads(bin.decode(globals.ENCODING))
             Server.blocks = data['result']['blocks']
             return super().run()
@@ -175,23 +177,25 @@ class Server():
             super().__init__()
             
         def run(self) -> None:
+            stream = MessageStream(self.__conn)
             alive = True
             while alive:
-                bin = self.__conn.recv(1024)
-                if len(bin) > 2:
-                    Server.logger.info(f"Received {bin} from {self.__conn}")
-                    segmented_data = bin.split(b"\n")
-                    for data in segmented_data:
-                        data = data.decode(globals.ENCODING)
-                        message: dict = json.loads(data)
-                        message_type = message.get("message_type")
-                        message_data = message.get("message_data")
-                            
-                        if message_type == Server.MessageType.CLOSE.value:
-                            alive = False
-                            self.__conn.close()
-                        else:
-                            Server.queue.put((message_type, message_data, self.__address, self.__conn))
+                try:
+                    messages = stream.read()
+                except ValueError as e:
+                    Server.logger.error(f"Dropping connection {self.__address} --resolution: {e}")
+                    break
+                if messages is None:
+                    break
+                for message in messages:
+                    Server.logger.debug("Received %s from %s", message, self.__conn)
+                    message_type = message.get("message_type")
+                    message_data = message.get("message_data")
+                        
+                    if message_type == Server.MessageType.CLOSE.value:
+                        alive = False
+                        break
+                    Server.queue.put((message_type, message_data, self.__address, self.__conn))
             self.__conn.close()
     
     class EmitBlockToDataLayerThread(threading.Thread):
@@ -203,14 +207,14 @@ class Server():
             super().__init__()
         
         def run(self) -> None:
-            self.__sock.sendall(json.dumps({
+            self.__sock.sendall(encode_message({
                 "message_type": 3,
                 "message_data": self.__block.serialize()
-            }).encode(globals.ENCODING))
+            }))
             Server.logger.info("Connected with data layer and sended serialized data")
             bin = self.__sock.recv(1024)
             data = json.loads(bin.decode(globals.ENCODING))
-            Server.logger.info(f"Emitted block response --data: {data}")
+            Server.logger.debug("Emitted block response --data: %s", data)
             self.__sock.close()
             return super().run()
                 
@@ -225,11 +229,7 @@ class Server():
     
     
     def __init__(self) -> None:
-        Server.logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler = logging.FileHandler("./logs/ConsensusLayer.log")
-        handler.setFormatter(formatter)
-        Server.logger.addHandler(handler)
+        setup_logger(Server.logger, "./logs/ConsensusLayer.log")
         self.logger.info("ConsensusServer initialization")
         self.__read_config()
         
@@ -273,7 +273,7 @@ class Server():
         Server.logger.info(f"Consuming message from {address}")
         if Server.is_validador:
             transaction = create_transaction(msg_type, msg_data)
-            Server.logger.info(f"Adding transaction: {transaction}")
+            Server.logger.debug("Adding transaction: %s", transaction)
             Server.stage_manager.add_transaction(transaction)
             Server.stage_manager.trigger_block_emission()
         else:
@@ -284,10 +284,10 @@ class Server():
                 validator_address = (Server.validators[key]["ip"], Server.validators[key]["port"])
                 Server.logger.info(f"Forward transaction to peer {key} in {validator_address}")
                 sock.connect(validator_address)
-                sock.sendall(json.dumps({
+                sock.sendall(encode_message({
                         "message_type": msg_type,
                         "message_data": msg_data 
-                }).encode(globals.ENCODING))
+                }))
         connection.sendall(json.dumps({"response": "Transaction Submitted"}).encode(globals.ENCODING))
                 
             
@@ -3,4 +3,8 @@ from abc import ABC, abstractmethod
 class ISerializable(ABC):
     @abstractmethod
     def serialize(self) -> dict[str, object]:
-        pass
\ No newline at end of file
+        pass
+
+    ## rendered only when something formats it, e.g. a log record that is not filtered out
+    def __str__(self) -> str:
+        return str(self.serialize())
@@ -0,0 +1,30 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+import globals
+
+_listeners: dict[str, QueueListener] = dict()
+_lock = threading.Lock()
+
+## The layer loggers hand records to a queue and one listener thread per log file does
+## the writing, so request threads never wait on disk. Files rotate at midnight like the
+## udht log. Calling it again for a logger that is already set up does not add another handler
+def setup_logger(logger: logging.Logger, filename: str) -> logging.Logger:
+    with _lock:
+        listener = _listeners.get(filename, None)
+        if listener is None:
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            handler = TimedRotatingFileHandler(filename, when="midnight", interval=1, backupCount=globals.LOG_BACKUP_COUNT)
+            handler.suffix = "%Y-%m-%d"
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            listener = QueueListener(queue.SimpleQueue(), handler)
+            listener.start()
+            atexit.register(listener.stop)
+            _listeners[filename] = listener
+        if not any(isinstance(handler, QueueHandler) for handler in logger.handlers):
+            logger.setLevel(globals.LOG_LEVEL)
+            logger.addHandler(QueueHandler(listener.queue))
+    return logger
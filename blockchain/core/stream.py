@@ -0,0 +1,63 @@
+import json
+import socket
+import struct
+import globals
+
+## Newline delimited JSON for the blockchain layers' sockets, messages split across recv
+## calls or packed into one are framed from a buffer kept between reads. Lines over
+## max_size without a delimiter raise ValueError. udht keeps a separate copy of this
+## class, the services are deployed from separate directories and do not import each other
+class MessageStream():
+    def __init__(self, connection: socket.socket, delimiter: bytes = b"\n", buffer_size: int = 4096, max_size: int = globals.MESSAGE_MAX_SIZE) -> None:
+        self.__connection   = connection
+        self.__max_size     = max_size
+        self.__delimiter    = delimiter
+        self.__buffer_size  = buffer_size
+        self.__buffer       = bytearray()
+        self.__scanned      = 0
+
+    def read(self) -> list[dict] | None:
+        chunk = self.__connection.recv(self.__buffer_size)
+        if not chunk:
+            return None
+        self.__buffer += chunk
+        messages = list()
+        start = 0
+        with memoryview(self.__buffer) as view:
+            index = self.__buffer.find(self.__delimiter, self.__scanned)
+            while index != -1:
+                if index - start > 0:
+                    data = str(view[start:index], globals.ENCODING)
+                    if not data.isspace():
+                        messages.append(json.loads(data))
+                start = index + len(self.__delimiter)
+                index = self.__buffer.find(self.__delimiter, start)
+        if start:
+            del self.__buffer[:start]
+        if len(self.__buffer) > self.__max_size:
+            raise ValueError(f"message exceeds {self.__max_size} bytes without a delimiter")
+        self.__scanned = max(0, len(self.__buffer) - len(self.__delimiter) + 1)
+        return messages
+
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message).encode(globals.ENCODING) + b"\n"
+
+
+## Length framed payloads, a 4 byte big-endian size followed by the payload. Used by the
+## udht hash-table stream, returns None when the peer closes before a full frame arrives
+def read_frame(connection: socket.socket) -> bytes | None:
+    header = receive_exactly(connection, 4)
+    if header is None:
+        return None
+    return receive_exactly(connection, struct.unpack(">I", header)[0])
+
+def receive_exactly(connection: socket.socket, size: int) -> bytes | None:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = connection.recv_into(view[received:], size - received)
+        if count == 0:
+            return None
+        received += count
+    return bytes(buffer)
@@ -1,5 +1,7 @@
 from concurrent.futures import ThreadPoolExecutor
 from core.chain.block import Block
+from core.stream import MessageStream
+from core.logger import setup_logger
 from enum import Enum
 from queue import Queue
 
@@ -73,7 +75,7 @@ class Server():
         def serialize_chain(self) -> None:
             Server.logger.info("ChainManager: starting chain serialization")
             for chunk in self.__chunks:
-                Server.logger.info(f"ChainManager: chunk about to be serializated --data: {chunk}")
+                Server.logger.debug("ChainManager: chunk about to be serializated --data: %s", chunk)
                 chunk_filename: str = chunk.get("chunkFilename")
                 writeable_data = json.dumps(chunk)
                 with open(f"{globals.SERIALIZED_CHAIN_DIRECTORY}/{chunk_filename}", "w+") as f:
@@ -97,8 +99,8 @@ class Server():
                 Server.logger.info(f"ChainManager: appended on the end of the last chunk --result: {hash}")
             else:
                 last_block_hash = last_block.get_header().get("blockHash")
-                Server.logger.info(f"ChainManager: Last block info: {last_block.serialize()}")
-                Server.logger.info(f"ChainManager: Hash verification={hash==last_block_hash}\n{hash}\n{last_block_hash}")
+                Server.logger.debug("ChainManager: Last block info: %s", last_block)
+                Server.logger.debug("ChainManager: Hash verification=%s\n%s\n%s", hash == last_block_hash, hash, last_block_hash)
                 if block.get_last_hash() == last_block_hash:
                     if (len(json.dumps(self.__chunks[-1]).encode(globals.ENCODING)) > 5 * 1024 * 1024):
                         self.__chunks.append({
@@ -135,24 +137,25 @@ class Server():
             super().__init__()
             
         def run(self) -> None:
+            stream = MessageStream(self.__connection)
             alive = True
             while alive:
                 try:
-                    bin = self.__connection.recv(1024)
-                    if len(bin) > 2:
-                        Server.logger.info(f"Received data from client --data: {bin} from {self.__address}")
-                        segmented_data = bin.split(b"\n")
-                        for data in segmented_data:
-                            data = data.decode(globals.ENCODING)
-                            message:dict = json.loads(data)
-                            message_type = message.get("message_type")
-                            message_data = message.get("message_data")
-                            if message_type == Server.MessageType.CLOSE.value:
-                                alive = False
-                                self.__connection.close()
-                            else:
-                                Server.logger.info(f"Putting request: {message_type} on queue")
-                                Server.queue.put((message_type, message_data, self.__address, self.__connection))
+                    messages = stream.read()
+                    if messages is None:
+                        alive = False
+                        self.__connection.close()
+                        continue
+                    for message in messages:
+                        Server.logger.debug("Received data from client --data: %s from %s", message, self.__address)
+                        message_type = message.get("message_type")
+                        message_data = message.get("message_data")
+                        if message_type == Server.MessageType.CLOSE.value:
+                            alive = False
+                            self.__connection.close()
+                            break
+                        Server.logger.info(f"Putting request: {message_type} on queue")
+                        Server.queue.put((message_type, message_data, self.__address, self.__connection))
                 except:
                     alive = False
                     self.__connection.close()
@@ -180,11 +183,7 @@ class Server():
     
     def __init__(self) -> None:
         
-        Server.logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler = logging.FileHandler("./logs/DataLayer.log")
-        handler.setFormatter(formatter)
-        Server.logger.addHandler(handler)
+        setup_logger(Server.logger, "./logs/DataLayer.log")
         self.logger.info("Data-layer initialization")
 
         self.__read_config()
@@ -246,10 +245,10 @@ class Server():
             
             
             elif msg_type == Server.MessageType.ADD_BLOCK.value:
-                Server.logger.info(f"Starting process for adding new block from {address} --data: {msg_data}")
+                Server.logger.debug("Starting process for adding new block from %s --data: %s", address, msg_data)
                 header = Block.Header(msg_data.get("__header"))
                 payload = Block.Payload(msg_data.get("payload"))
-                Server.logger.info(f"New-block --header: {header} --payload: {payload}")
+                Server.logger.debug("New-block --header: %s --payload: %s", header, payload)
                 result, hash = Server.chain_manager.add_block(Block(header=header, payload=payload))
                 Server.logger.info(f"Block added-process --result: {result}")
                 if result:
@@ -1,5 +1,10 @@
+import os
+
 CONFIG_FILE = "./config.yaml"
 ENCODING="utf-8"
+MESSAGE_MAX_SIZE=16 * 1024 * 1024
+LOG_LEVEL=os.getenv("LOG_LEVEL", "INFO")
+LOG_BACKUP_COUNT=int(os.getenv("LOG_BACKUP_COUNT", 7))  # rotated daily files kept per layer
 
 ## =========== ###
 ## DATA LAYER  ###
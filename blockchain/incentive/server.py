@@ -8,6 +8,8 @@ import socket
 import threading
 import yaml
 import globals
+from core.stream import encode_message
+from core.logger import setup_logger
 
 class Server():
     class ServerMessage(Enum):
@@ -29,17 +31,17 @@ class Server():
             super().__init__()
             
         def run(self) -> None:
-            self.connection.sendall(json.dumps({ "message_type": 2 }).encode(globals.ENCODING))
+            self.connection.sendall(encode_message({ "message_type": 2 }))
             bin = self.connection.recv(4024)
             data = json.loads(bin.decode(globals.ENCODING))
             chain = data["result"]
             transactions = [tx for block in chain for tx in block["payload"]["transactions"]]
-            Server.logger.info(f"Blockchain transactions --data: {transactions}")
+            Server.logger.debug("Blockchain transactions --data: %s", transactions)
             df = pandas.DataFrame(transactions)
             Server.transactions = df
             Server.logger.info(f"--len: {len(df)}")
-            Server.logger.info(df)
-            Server.logger.info(df["peerId"])
+            Server.logger.debug("%s", df)
+            Server.logger.debug("%s", df["peerId"])
             return super().run()
         
     class ClientConnectionThread(threading.Thread):
@@ -54,7 +56,7 @@ class Server():
                 try:
                     bin = self.__connection.recv(1024)
                     if len(bin) > 2:
-                        Server.logger.info(f"Received {bin} from {self.__address}")
+                        Server.logger.debug("Received %s from %s", bin, self.__address)
                         data = json.loads(bin.decode(globals.ENCODING))
                         message_type = int(data["message_type"])
                         message_data = data["message_data"]
@@ -68,7 +70,7 @@ class Server():
                                 filtered_transaction: pandas.DataFrame = Server.transactions.loc[
                                     (Server.transactions["peerId"] == peer_id) 
                                 ]
-                                Server.logger.info(f"Peer transactions {filtered_transaction}")
+                                Server.logger.debug("Peer transactions %s", filtered_transaction)
                                 initial_value   = 5
                                 total_cost      = filtered_transaction.loc[filtered_transaction["transactionCost"].notna(), "transactionCost"].sum()
                                 total_reward    = filtered_transaction.loc[filtered_transaction["transactionReward"].notna(), "transactionReward"].sum() 
@@ -93,11 +95,7 @@ class Server():
             return super().run()
     
     def __init__(self) -> None:
-        Server.logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler = logging.FileHandler("./logs/IncetiveLayer.log")
-        handler.setFormatter(formatter)
-        Server.logger.addHandler(handler)
+        setup_logger(Server.logger, "./logs/IncetiveLayer.log")
         self.logger.info("Incentive initialization")
         self.__read_config()
         
@@ -11,6 +11,8 @@ import socket
 import threading
 import yaml
 import globals
+from core.stream import encode_message, read_frame
+from core.logger import setup_logger
 
 class Server():
     class FBE():
@@ -55,7 +57,7 @@ class Server():
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             while not self.__queue.empty():
                 block = self.__queue.get() 
-                Server.logger.info(f"FBE: Next emitted block --data: {block}")
+                Server.logger.debug("FBE: Next emitted block --data: %s", block)
                 for key in keys:
                     Server.logger.info(f"FBE: Next key to be sent --data: {key}")
                     peer = Server.user_hashtable.get(key)
@@ -101,8 +103,8 @@ class Server():
         
     class RequestDataThread(threading.Thread):
         def __init__(self) -> None:
-            self.__encoded_message_udht = json.dumps({ "message_type": 2 }).encode(globals.ENCODING)
-            self.__encoded_message_data = json.dumps({ "message_type": 4 }).encode(globals.ENCODING)
+            self.__encoded_message_udht = encode_message({ "message_type": 2 })
+            self.__encoded_message_data = encode_message({ "message_type": 4 })
             self.__udht_address = (Server.configuration["udht"]["manager"]["ip"], Server.configuration["udht"]["manager"]["port"])
             self.__data_address = (Server.configuration["blockchain"]["data"]["ip"], Server.configuration["blockchain"]["data"]["port"])
             super().__init__()
@@ -113,13 +115,19 @@ class Server():
             return super().run()
         
         def __request_udht(self) -> None:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect(self.__udht_address)
-            sock.sendall(self.__encoded_message_udht)
-            bin = sock.recv(4024)
-            Server.logger.info(f"{self}: Received user hashtable --data: {bin}")
-            hashtable = pickle.loads(bin)
-            sock.close()
+            hashtable = dict()
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.connect(self.__udht_address)
+                sock.sendall(self.__encoded_message_udht)
+                while True:
+                    frame = read_frame(sock)
+                    if frame is None:
+                        raise ConnectionError("udht closed the connection while streaming the hashtable")
+                    page = pickle.loads(frame)
+                    hashtable.update(page["peers"])
+                    if page["cursor"] is None:
+                        break
+            Server.logger.info(f"{self}: Received user hashtable --len: {len(hashtable)}")
             Server.user_hashtable = hashtable
         
         def __request_blockchain_chunk(self) -> None:
@@ -128,7 +136,7 @@ class Server():
                 sock.sendall(self.__encoded_message_data)
                 bin = sock.recv(4028)
                 data = bin.decode(globals.ENCODING)
-                Server.logger.info(f"{self}: Received decoded data chunk --data: {data}")
+                Server.logger.debug("%s: Received decoded data chunk --data: %s", self, data)
                 data: dict = json.loads(data)
                 Server.blocks = data["result"]["blocks"]
             
@@ -141,7 +149,7 @@ class Server():
         def run(self) -> None:
             arr_bytes = self.__conn.recv(1024)          
             data:dict = json.loads(arr_bytes.decode(globals.ENCODING))  
-            Server.logger.info(f"ClientThreadConnection:{self.__address}: incoming request --data: {data}")
+            Server.logger.debug("ClientThreadConnection:%s: incoming request --data: %s", self.__address, data)
             request_type = data.get("request_type")
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.connect(Server.data_layer_adress)
@@ -158,11 +166,11 @@ class Server():
                 # ---------------------------------------------------------
                 
                 if (len(Server.blocks) == 0):
-                    sock.sendall(json.dumps(add_block_message).encode(globals.ENCODING))
+                    sock.sendall(encode_message(add_block_message))
                     data_response = sock.recv(1024)
                 else:
                     current_block:dict = Server.blocks[-1]
-                    Server.logger.info(f"ClientThreadConnection: resolver: there are loaded blocks in the chunk --lastBlock: {current_block}")
+                    Server.logger.debug("ClientThreadConnection: resolver: there are loaded blocks in the chunk --lastBlock: %s", current_block)
                     
                     ## verify chain connection
                     current_hash = current_block.get("__header")["blockHash"]
@@ -182,20 +190,21 @@ class Server():
                         response.set(Server.ClientResponse.OPERATION_CODE.REJECTED_INVALID_BLOCK_NUMBER, "Incoming block number dit not had a valid block number")
 
                     if (response.opt_code == Server.ClientResponse.OPERATION_CODE.WAITING_VALIDATION):
-                        sock.sendall(json.dumps(add_block_message).encode(globals.ENCODING))
+                        sock.sendall(encode_message(add_block_message))
                         data_response = sock.recv(1024)
                 
                 if data_response != None:
                     decoded_data = data_response.decode(globals.ENCODING)
-                    Server.logger.info(f"ClientThreadConnection: data-layer response --data: {decoded_data}")
+                    Server.logger.debug("ClientThreadConnection: data-layer response --data: %s", decoded_data)
                     data: dict = json.loads(decoded_data)
                     result = data.get("result")
                     hash = data.get("hash")
                     response.opt_code = Server.ClientResponse.OPERATION_CODE.ACCEPTED_AND_FORWARD if result else Server.ClientResponse.OPERATION_CODE.REJECTED_DATA_LAYER_NOT_ACCEPTED
                     response.msg = data.get("message")
                 
-                Server.logger.info(f"ClientThreadConnection: response to {self.__address}: {response.serialize()}")
-                self.__conn.sendall(response.serialize())
+                serialized_response = response.serialize()
+                Server.logger.debug("ClientThreadConnection: response to %s: %s", self.__address, serialized_response)
+                self.__conn.sendall(serialized_response)
                 
                 # If accepted send it to the Forward Block Enhenment
                 if response.opt_code == Server.ClientResponse.OPERATION_CODE.ACCEPTED_AND_FORWARD:
@@ -206,7 +215,7 @@ class Server():
                     
             # Incoming blockchain request or chunk request
             if request_type == Server.MessageType.BLOCKCHAIN_REQUEST.value:
-                sock.sendall(json.dumps({ "message_type": 2}).encode(globals.ENCODING))
+                sock.sendall(encode_message({ "message_type": 2}))
                 bin = sock.recv(1024)
                 data = json.loads(bin.decode(globals.ENCODING))
                 response = Server.ClientResponse()
@@ -224,11 +233,7 @@ class Server():
     forward_block_enhencement           = FBE()
     
     def __init__(self) -> None:
-        Server.logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler = logging.FileHandler("./logs/NetworkLayer.log")
-        handler.setFormatter(formatter)
-        Server.logger.addHandler(handler)
+        setup_logger(Server.logger, "./logs/NetworkLayer.log")
         self.logger.info("NetworkLayer initialization")
         self.__read_config()
         Server.data_layer_adress = (Server.configuration["blockchain"]["data"]["ip"], Server.configuration["blockchain"]["data"]["port"])
@@ -4,13 +4,14 @@ import queue
 import socket
 import globals
 import yaml
+from core.stream import encode_message
 
 class Server():
     
     configuration   : dict[str, object]           = dict()
 
     def __init__(self) -> None:
-        self.close_message = json.dumps({"message_type": 1}).encode(globals.ENCODING)
+        self.close_message = encode_message({"message_type": 1})
         self.__read_config()
         
     def __read_config(self) -> None:
@@ -104,7 +105,7 @@ class Server():
                 }
             }
         
-        sock.sendall(json.dumps(message).encode(globals.ENCODING))
+        sock.sendall(encode_message(message))
         response = sock.recv(4024)
         response = json.loads(response.decode(globals.ENCODING))
         
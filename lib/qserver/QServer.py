@@ -1,18 +1,31 @@
 from __future__ import annotations
+import asyncio
 import inspect
 import json
 import re
 import socket
 import struct
 import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, wait
 from datetime import datetime
-from queue import Queue
+from enum import Enum
+from queue import Empty, Full, Queue
 from typing import Any, Callable, Self, Type, TypeVar, Generic
 from abc import ABC, ABCMeta, abstractmethod
 from functools import wraps
+from types import MappingProxyType
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 T = TypeVar('T')
 SOCKET_BUFFER = 1024
+IOV_MAX = 1024
 DEBUG = False
 
 def dprint(*args, **kwargs):
@@ -32,12 +45,183 @@ class MessagePolicy():
     def buildPackage(self, message: bytes, socket: socket.socket) -> bytes:
         pass
 
+    async def receivePackageAsync(self, reader: asyncio.StreamReader) -> bytes:
+        return await reader.read(SOCKET_BUFFER)
+
+    ## buffer limit of the asyncio StreamReader, it bounds how long a readuntil frame can be
+    def readerLimit(self) -> int:
+        return 64 * 1024
+
+    ## framing split in separate buffers so connections can send them vectored without concatenating
+    def buildBuffers(self, message: bytes) -> list[bytes]:
+        return [self.buildPackage(message)]
+
+    def release(self, socket: socket.socket) -> None:
+        pass
+
+
+class FrameBuffer():
+    def __init__(self, size: int):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.scanned = 0
+
+    def available(self) -> int:
+        return self.end - self.start
+
+    ## makes room for size bytes counting from start, views already handed out keep
+    ## pointing to the old buffer when it has to grow since the bytearray is never resized
+    def reserve(self, size: int) -> None:
+        if self.start + size <= len(self.buffer):
+            return
+        available = self.available()
+        if size <= len(self.buffer):
+            self.view[:available] = self.view[self.start:self.end]
+        else:
+            buffer = bytearray(max(size, len(self.buffer) * 2))
+            view = memoryview(buffer)
+            view[:available] = self.view[self.start:self.end]
+            self.buffer, self.view = buffer, view
+        self.scanned -= self.start
+        self.start = 0
+        self.end = available
+
+    def consume(self, size: int) -> memoryview:
+        frame = self.view[self.start:self.start + size]
+        self.start += size
+        self.scanned = self.start
+        if self.start == self.end:
+            self.start = self.end = self.scanned = 0
+        return frame
+
+    def fill(self, socket: socket.socket) -> int:
+        received = socket.recv_into(self.view[self.end:])
+        self.end += received
+        return received
 
+## message policies are shared by every connection of a server, the parsing state of each socket lives here
+class FrameBufferPool():
+    def __init__(self, bufferSize: int):
+        self.bufferSize = bufferSize
+        self.__buffers: weakref.WeakKeyDictionary[socket.socket, FrameBuffer] = weakref.WeakKeyDictionary()
+        self.__lock = threading.Lock()
+
+    def get(self, socket: socket.socket) -> FrameBuffer:
+        frameBuffer = self.__buffers.get(socket)
+        if frameBuffer is None:
+            with self.__lock:
+                frameBuffer = self.__buffers.setdefault(socket, FrameBuffer(self.bufferSize))
+        return frameBuffer
+
+    def release(self, socket: socket.socket) -> None:
+        with self.__lock:
+            self.__buffers.pop(socket, None)
+
+##
+## Every frame has exactly messageSize bytes, a 4 byte big-endian payload length followed
+## by the payload and padding up to messageSize. The length keeps payloads that end in the
+## padding byte intact. Bytes of the next frame stay buffered for the next call, frames
+## with an empty payload (padding only) are skipped
+##
 class FixedSizeMessagePolicy(MessagePolicy):
-    ...
+    HEADER = struct.Struct('>I')
 
+    def __init__(self, messageSize: int = SOCKET_BUFFER, padding: bytes = b'\x00'):
+        if messageSize <= self.HEADER.size:
+            raise ValueError(f"Fixed size of {messageSize} bytes leaves no room for the {self.HEADER.size} byte length header")
+        self.messageSize = messageSize
+        self.padding = padding
+        self.__frameBuffers = FrameBufferPool(max(messageSize, SOCKET_BUFFER))
+        super().__init__()
+
+    def receivePackage(self, socket: socket.socket) -> bytes:
+        frameBuffer = self.__frameBuffers.get(socket)
+        while True:
+            while frameBuffer.available() < self.messageSize:
+                frameBuffer.reserve(self.messageSize)
+                if frameBuffer.fill(socket) == 0:
+                    return b''
+            frame = self.__payload(frameBuffer.consume(self.messageSize))
+            if len(frame) > 0:
+                return frame
+
+    async def receivePackageAsync(self, reader: asyncio.StreamReader) -> bytes:
+        while True:
+            try:
+                frame = self.__payload(await reader.readexactly(self.messageSize))
+            except asyncio.IncompleteReadError:
+                return b''
+            if len(frame) > 0:
+                return frame
+
+    def buildPackage(self, message: bytes) -> bytes:
+        if len(message) > self.messageSize - self.HEADER.size:
+            raise ValueError(f"Message of {len(message)} bytes exceeds the fixed size of {self.messageSize} minus its length header")
+        return (self.HEADER.pack(len(message)) + message).ljust(self.messageSize, self.padding)
+
+    def __payload(self, frame: bytes | memoryview) -> bytes:
+        size = self.HEADER.unpack_from(frame)[0]
+        if size > self.messageSize - self.HEADER.size:
+            raise ValueError(f"Frame declares {size} bytes, more than fits in the fixed size of {self.messageSize}")
+        return bytes(frame[self.HEADER.size:self.HEADER.size + size])
+
+    def release(self, socket: socket.socket) -> None:
+        self.__frameBuffers.release(socket)
+
+##
+## Frames end with the delimiter, a read can hold several frames or only part of one.
+## The search resumes where the last one stopped so partial frames are not scanned twice.
+## Empty frames are skipped, an empty return always means the connection was closed
+##
 class DelimiterMessagePolicy(MessagePolicy):
-    ...
+
+    def __init__(self, delimiter: bytes = b'\n', maxSize: int = 16 * 1024 * 1024, bufferSize: int = 64 * 1024):
+        self.delimiter = delimiter
+        self.maxSize = maxSize
+        self.__frameBuffers = FrameBufferPool(bufferSize)
+        super().__init__()
+
+    def receivePackage(self, socket: socket.socket) -> memoryview | bytes:
+        frameBuffer = self.__frameBuffers.get(socket)
+        delimiterSize = len(self.delimiter)
+        while True:
+            index = frameBuffer.buffer.find(self.delimiter, frameBuffer.scanned, frameBuffer.end)
+            if index != -1:
+                frame = frameBuffer.consume(index - frameBuffer.start + delimiterSize)[:-delimiterSize]
+                if len(frame) > 0:
+                    return frame
+                continue
+            frameBuffer.scanned = max(frameBuffer.start, frameBuffer.end - delimiterSize + 1)
+            if frameBuffer.available() > self.maxSize:
+                raise ValueError(f"Frame exceeds the maximum size of {self.maxSize} bytes without a delimiter")
+            frameBuffer.reserve(frameBuffer.available() + SOCKET_BUFFER)
+            if frameBuffer.fill(socket) == 0:
+                return b''
+
+    async def receivePackageAsync(self, reader: asyncio.StreamReader) -> bytes:
+        while True:
+            try:
+                frame = await reader.readuntil(self.delimiter)
+            except asyncio.IncompleteReadError:
+                return b''
+            except asyncio.LimitOverrunError:
+                raise ValueError(f"Frame exceeds the maximum size of {self.maxSize} bytes without a delimiter")
+            if len(frame) > len(self.delimiter):
+                return frame[:-len(self.delimiter)]
+
+    def readerLimit(self) -> int:
+        return self.maxSize + len(self.delimiter)
+
+    def buildPackage(self, message: bytes) -> bytes:
+        return message + self.delimiter
+
+    def buildBuffers(self, message: bytes) -> list[bytes]:
+        return [message, self.delimiter]
+
+    def release(self, socket: socket.socket) -> None:
+        self.__frameBuffers.release(socket)
 
 class HeaderMessagePolicy(MessagePolicy):
     
@@ -61,10 +245,64 @@ class HeaderMessagePolicy(MessagePolicy):
             data += chunk
         return data
 
+    async def receivePackageAsync(self, reader: asyncio.StreamReader) -> bytes:
+        try:
+            header = await reader.readexactly(self.headerLenght)
+            messageSize = struct.unpack('>I', header)[0]
+            return await reader.readexactly(messageSize)
+        except asyncio.IncompleteReadError:
+            return b''
+
     def buildPackage(self, message: bytes) -> bytes:
         header = struct.pack('>I', len(message))
         return header + message
+
+    def buildBuffers(self, message: bytes) -> list[bytes]:
+        return [struct.pack('>I', len(message)), message]
     
+##
+## Same framing as HeaderMessagePolicy but reading through a reusable buffer per socket,
+## one recv_into can carry several frames and the payloads are memoryviews over the buffer.
+## A returned view is only valid until the next receivePackage on the same socket.
+## The header is checked against maxSize before any room is reserved for the frame
+##
+class BufferedHeaderMessagePolicy(HeaderMessagePolicy):
+
+    def __init__(self, headerLength: int = 4, bufferSize: int = 64 * 1024, maxSize: int = 16 * 1024 * 1024):
+        self.maxSize = maxSize
+        self.__frameBuffers = FrameBufferPool(bufferSize)
+        super().__init__(headerLength)
+
+    def receivePackage(self, socket: socket.socket) -> memoryview | bytes:
+        frameBuffer = self.__frameBuffers.get(socket)
+        while True:
+            available = frameBuffer.available()
+            if available >= self.headerLenght:
+                messageSize = struct.unpack_from('>I', frameBuffer.buffer, frameBuffer.start)[0]
+                if messageSize > self.maxSize:
+                    raise ValueError(f"Frame of {messageSize} bytes exceeds the maximum size of {self.maxSize} bytes")
+                frameSize = self.headerLenght + messageSize
+                if available >= frameSize:
+                    return frameBuffer.consume(frameSize)[self.headerLenght:]
+                frameBuffer.reserve(frameSize)
+            else:
+                frameBuffer.reserve(self.headerLenght)
+            if frameBuffer.fill(socket) == 0:
+                return b''
+
+    async def receivePackageAsync(self, reader: asyncio.StreamReader) -> bytes:
+        try:
+            header = await reader.readexactly(self.headerLenght)
+            messageSize = struct.unpack('>I', header)[0]
+            if messageSize > self.maxSize:
+                raise ValueError(f"Frame of {messageSize} bytes exceeds the maximum size of {self.maxSize} bytes")
+            return await reader.readexactly(messageSize)
+        except asyncio.IncompleteReadError:
+            return b''
+
+    def release(self, socket: socket.socket) -> None:
+        self.__frameBuffers.release(socket)
+
 class Package():
     def __init__(self, payload: object, msg: str, statusCode: int):
         self.payload = payload
@@ -77,21 +315,98 @@ class Package():
     def encode(self, encoding: str) -> bytes:
         return self.serialize().encode(encoding=encoding)
 
-class JsonPackage(Package):
-    def serialize(self):
-        return json.dumps({
+    def content(self) -> dict[str, Any]:
+        return {
             "status": self.statusCode,
             "message": self.msg,
             "payload": self.payload
-        })
+        }
 
+class JsonPackage(Package):
+    def serialize(self):
+        return json.dumps(self.content())
+
+##
+## A codec turns the package content into bytes and back. Servers configured with setCodecs
+## pick the codec of every incoming package from its first byte and answer the connection
+## with the same codec, so each client negotiates simply by the format it sends
+##
+class Codec():
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes | memoryview) -> Any:
+        pass
+
+    @abstractmethod
+    def accepts(self, data: bytes | memoryview) -> bool:
+        pass
+
+    @staticmethod
+    def negotiate(data: bytes | memoryview, codecs: list[Codec]) -> Codec:
+        for codec in codecs:
+            if codec.accepts(data):
+                return codec
+        raise ValueError(f"No codec among {[codec.name for codec in codecs]} accepts the package")
+
+class JsonCodec(Codec):
+    name = "json"
+    __starts = frozenset(b'{["\t\r\n ')
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data).encode(self.encoding)
+
+    def decode(self, data: bytes | memoryview) -> Any:
+        return json.loads(str(data, self.encoding))
+
+    def accepts(self, data: bytes | memoryview) -> bool:
+        return len(data) > 0 and data[0] in JsonCodec.__starts
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("MsgpackCodec requires the msgpack package")
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, data: bytes | memoryview) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+    ## requests and packages are maps: fixmap, map16 or map32
+    def accepts(self, data: bytes | memoryview) -> bool:
+        return len(data) > 0 and (0x80 <= data[0] <= 0x8f or data[0] in (0xde, 0xdf))
+
+##
+## Outgoing packages are queued as separate header and body buffers and written with a
+## single sendmsg. The thread that finds no write in progress becomes the writer and drains
+## everything queued meanwhile, so packages sent concurrently from consumer threads are
+## coalesced. With autoFlush disabled packages wait for flush() or until flushThreshold bytes
+##
 class ClientConnection():
-    def __init__(self, socket: socket.socket, address: tuple[str, int], bufSize: int = SOCKET_BUFFER, messagePolicy: MessagePolicy = None) -> None:
+    def __init__(self, socket: socket.socket, address: tuple[str, int], bufSize: int = SOCKET_BUFFER, messagePolicy: MessagePolicy = None, autoFlush: bool = True, flushThreshold: int = 64 * 1024) -> None:
         self.__socket = socket
         self.__address = address
         self.__bufferSize = bufSize
         self.__messagePolicy = messagePolicy
+        self.__autoFlush = autoFlush
+        self.__flushThreshold = flushThreshold
+        self.__pending: list[bytes] = list()
+        self.__pendingBytes = 0
+        self.__flushing = False
+        ## guards the pending buffers, flush waits on it while another thread drains
+        self.__writeLock = threading.Condition()
         self.encoder = "utf-8"
+        self.codec: Codec = None
 
     def package(self) -> bytes:
         if not self.__messagePolicy:
@@ -99,26 +414,136 @@ class ClientConnection():
             return recv
         return self.__messagePolicy.receivePackage(self.__socket)
     
+    def encodePackage(self, package: Package) -> bytes:
+        if self.codec:
+            return self.codec.encode(package.content())
+        return package.encode(self.encoder)
+
     def sendPackage(self, package: Package):
-        if not self.__messagePolicy:
-            self.__socket.sendall(package.encode(self.encoder))
-            return 
-        bytes = self.__messagePolicy.buildPackage(message=package.encode(self.encoder))
-        self.__socket.sendall(bytes)
+        message = self.encodePackage(package)
+        buffers = self.__messagePolicy.buildBuffers(message=message) if self.__messagePolicy else [message]
+        with self.__writeLock:
+            self.__pending.extend(buffers)
+            self.__pendingBytes += sum(len(buffer) for buffer in buffers)
+            if self.__flushing or (not self.__autoFlush and self.__pendingBytes < self.__flushThreshold):
+                return
+            self.__flushing = True
+        self.__drain()
+
+    ## returns once everything queued before the call was sent, waiting for a drain running
+    ## on another thread to finish before sending what is still pending
+    def flush(self):
+        with self.__writeLock:
+            self.__writeLock.wait_for(lambda: not self.__flushing)
+            if not self.__pending:
+                return
+            self.__flushing = True
+        self.__drain()
+
+    def setAutoFlush(self, autoFlush: bool):
+        self.__autoFlush = autoFlush
+        if autoFlush:
+            self.flush()
 
     def sendAndClose(self, package: Package):
         self.sendPackage(package)
         self.close()
 
+    ## wakes up a thread blocked reading this connection, the reading side then closes it
+    def shutdown(self):
+        try:
+            self.__socket.shutdown(socket.SHUT_RDWR)
+        except OSError as e:
+            dprint(f"(-) Shutdown of an already closed connection: {e}")
+
     def close(self):
+        try:
+            self.flush()
+        except OSError as e:
+            dprint(f"(-) Pending packages lost on close: {e}")
+        if self.__messagePolicy:
+            self.__messagePolicy.release(self.__socket)
         self.__socket.close()
-        
+
+    def __drain(self):
+        try:
+            while True:
+                with self.__writeLock:
+                    if not self.__pending:
+                        self.__flushing = False
+                        self.__writeLock.notify_all()
+                        return
+                    buffers, self.__pending = self.__pending, list()
+                    self.__pendingBytes = 0
+                self.__sendBuffers(buffers)
+        except BaseException:
+            with self.__writeLock:
+                self.__flushing = False
+                self.__writeLock.notify_all()
+            raise
+
+    def __sendBuffers(self, buffers: list[bytes]):
+        if not hasattr(self.__socket, "sendmsg"):
+            self.__socket.sendall(b"".join(buffers))
+            return
+        views = [memoryview(buffer) for buffer in buffers if len(buffer) > 0]
+        while views:
+            sent = self.__socket.sendmsg(views[:IOV_MAX])
+            index = 0
+            while index < len(views) and sent >= len(views[index]):
+                sent -= len(views[index])
+                index += 1
+            views = views[index:]
+            if sent:
+                views[0] = views[0][sent:]
+
+class AsyncClientConnection(ClientConnection):
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, address: tuple[str, int], bufSize: int = SOCKET_BUFFER, messagePolicy: MessagePolicy = None) -> None:
+        self.__reader = reader
+        self.__writer = writer
+        self.__bufferSize = bufSize
+        self.__messagePolicy = messagePolicy
+        self.__loop = asyncio.get_running_loop()
+        self.__loopThread = threading.get_ident()
+        super().__init__(writer.get_extra_info("socket"), address, bufSize=bufSize, messagePolicy=messagePolicy)
+
+    async def package(self) -> bytes:
+        if not self.__messagePolicy:
+            return await self.__reader.read(self.__bufferSize)
+        return await self.__messagePolicy.receivePackageAsync(self.__reader)
+
+    def sendPackage(self, package: Package):
+        message = self.encodePackage(package)
+        buffers = self.__messagePolicy.buildBuffers(message=message) if self.__messagePolicy else [message]
+        self.__threadsafe(self.__writer.writelines, buffers)
+
+    ## the transport already buffers and coalesces writes made in the same loop iteration
+    def flush(self):
+        pass
+
+    def shutdown(self):
+        self.close()
+
+    def close(self):
+        self.__threadsafe(self.__writer.close)
+
+    async def drain(self):
+        await self.__writer.drain()
+
+    ## handlers dispatched by ConsumerFunctionHandler run outside the event loop thread,
+    ## the transport is not thread safe so the call is scheduled on the loop instead
+    def __threadsafe(self, func: Callable, *args):
+        if threading.get_ident() == self.__loopThread:
+            func(*args)
+        elif not self.__loop.is_closed():
+            self.__loop.call_soon_threadsafe(func, *args)
+
 class Thread():
     def __call__(self, func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
             t = threading.Thread(target=func, args=args, kwargs=kwargs)
-            print("(+) Thread started for function", func.__name__)
+            dprint("(+) Thread started for function", func.__name__)
             t.start()
         return wrapper
 
@@ -132,7 +557,7 @@ class Validator():
     class SizeValidator():
         @staticmethod
         def validate(value: object, arguments: dict) -> tuple[bool, ValueError | None]:
-            dprint(f"\t(*) Size validation of {value} with arguments: {arguments}")
+            dprint("\t(*) Size validation of", value, "with arguments:", arguments)
             minSize = arguments.get("minSize", None)
             maxSize = arguments.get("maxSize", None)
             if minSize and len(value) < minSize:
@@ -144,13 +569,14 @@ class Validator():
     class PatternValidator():
         @staticmethod
         def validate(value: object, arguments: dict) -> tuple[bool, ValueError | None]:
-            dprint(f"\t(*) Pattern validation of {value} with arguments: {arguments}")
-            pattern = arguments.get("pattern", None)
-            if pattern and not re.match(pattern, value):
-                return False, ValueError("The value do not match with the pattern " + str(pattern))
+            dprint("\t(*) Pattern validation of", value, "with arguments:", arguments)
+            pattern: re.Pattern = arguments.get("pattern", None)
+            if pattern and not pattern.match(value):
+                return False, ValueError("The value do not match with the pattern " + str(pattern.pattern))
             return True, None
 
 class Prototype(): 
+    __slots__ = ()
 
     def isValid(self) -> bool:
         scheme: dict[str, Prototype.Property] = getattr(self, "__scheme__", {})
@@ -168,8 +594,13 @@ class Prototype():
     class Property(Generic[T], ABC):
         def __init__(self, **k):
             self.arguments = k
+            self.compile()
             super().__init__()
 
+        ## called whenever the arguments change, precomputes what parse and validate need
+        def compile(self) -> None:
+            pass
+
         @abstractmethod
         def parse(self, value: Any) -> T:
             pass
@@ -180,6 +611,7 @@ class Prototype():
         def updateArgs(self, **k) -> Self:
             for key in k:
                 self.arguments[key] = k[key]
+            self.compile()
             return self
 
     class Boolean(Property[bool]):
@@ -192,6 +624,11 @@ class Prototype():
 
     class String(Property[str]):
         __validators = [Validator.SizeValidator, Validator.PatternValidator]
+        def compile(self) -> None:
+            pattern = self.arguments.get("pattern", None)
+            if pattern and isinstance(pattern, str):
+                self.arguments["pattern"] = re.compile(pattern)
+
         def parse(self, value):
             return str(value)
         
@@ -204,6 +641,9 @@ class Prototype():
 
     class DateTime(Property[datetime]):
         def parse(self, value):
+            ## fromisoformat is a C parser, only used when the value has exactly the strptime layout
+            if len(value) == 19 and value[10] == " " and value[13] == ":" and value[16] == ":":
+                return datetime.fromisoformat(value)
             return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
         
     class Dict(Property[dict[str, Any]]):
@@ -216,7 +656,8 @@ class Prototype():
             return compose
         
     def __str__(self) -> str:
-        return str(self.__dict__)
+        scheme: dict[str, Prototype.Property] = getattr(self, "__scheme__", {})
+        return str({ key: getattr(self, key, None) for key in scheme })
         
 
 class Map(Generic[T]):
@@ -224,26 +665,64 @@ class Map(Generic[T]):
     def __init__(self, code: T) -> None:
         self.code = code
 
+    ## the function is only tagged with its code, each QServer subclass collects the tagged
+    ## functions of its own body into a DispatchTable when the class is created
     def __call__(self, func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(s, *args, **kwargs):
-            return func(s, *args, **kwargs)
-        
         print(f"(+) Function {func.__name__} mapped with code {self.code}")
-        Map.__registry[self.code] = wrapper
-        return wrapper
+        func.__mapcode__ = self.code
+        Map.__registry[self.code] = func
+        return func
     
+    ## process wide view of the last function mapped with the code, servers dispatch through their own table
     @classmethod
     def getMappedFunction(cls, code: T) -> Callable:
         if code not in cls.__registry:
             raise KeyError(f'Code {code} not mapped in @Map decorator')
         return cls.__registry[code]
 
+class DispatchTable():
+    MAX_INDEXED_CODE = 1024
+
+    def __init__(self, mappedFunctions: dict[Any, Callable]):
+        indexed = [code for code in mappedFunctions if type(code) is int and 0 <= code < DispatchTable.MAX_INDEXED_CODE]
+        table: list[Callable | None] = [None] * (max(indexed) + 1 if indexed else 0)
+        for code in indexed:
+            table[code] = mappedFunctions[code]
+        self.table: tuple[Callable | None, ...] = tuple(table)
+        self.fallback = MappingProxyType({ code: function for code, function in mappedFunctions.items() if code not in indexed })
+
+    @staticmethod
+    def fromClass(cls: Type) -> DispatchTable:
+        mappedFunctions: dict[Any, Callable] = dict()
+        for base in reversed(cls.__mro__):
+            for attribute in vars(base).values():
+                code = getattr(attribute, "__mapcode__", None)
+                if code is not None and callable(attribute):
+                    mappedFunctions[code] = attribute
+        return DispatchTable(mappedFunctions)
+
+    def get(self, code: Any) -> Callable:
+        if type(code) is int and 0 <= code < len(self.table):
+            function = self.table[code]
+            if function is not None:
+                return function
+        function = self.fallback.get(code)
+        if function is None:
+            raise KeyError(f'Code {code} not mapped in @Map decorator')
+        return function
+
+    def codes(self) -> list[Any]:
+        return [code for code, function in enumerate(self.table) if function is not None] + list(self.fallback)
+
+def _raise(error: Exception):
+    raise error
+
 class ParamMap():
-    def __init__(self, isproperty: bool, property: Prototype.Property, scheme: dict[str, Prototype.Property]):
+    def __init__(self, isproperty: bool, property: Prototype.Property, scheme: dict[str, Prototype.Property], annotation: Type = None):
         self.isproperty = isproperty
         self.property = property
         self.scheme = scheme
+        self.annotation = annotation
 
 class PrototypeMap():
     def __init__(self):
@@ -261,32 +740,48 @@ class PrototypeMap():
                     print(f"(+) Mapping parameter {param_name} as {param_type.__name__} Prototype to function [{func.__name__}]")
                     self.__mapper[param_name] = self.buildMapper(param.annotation)
 
-        @wraps(func)
-        def wrapper(reference, package: dict, **k):
-            kwargs = dict()
-            for key in self.__mapper:
-                attribute_map = self.__mapper[key]
-                dprint(f"(*) Building for attribute {attribute_map}")
-                if attribute_map.isproperty:
-                    value = self.__mapper[key].property.parse(value=package[key])
-                    kwargs[key] = value
-                else:
-                    instance = Prototype()
-                    for attr in self.__mapper[key].scheme:
-                        packageValue = package.get(attr)
-                        if packageValue:
-                            value = self.__mapper[key].scheme[attr].parse(packageValue)
-                        else:
-                            optional = self.__mapper[key].scheme[attr].arguments.get("optional", False)
-                            if optional:
-                                value = None
-                            else:
-                                raise KeyError(attr)
-                        setattr(instance, attr, value)
-                    setattr(instance, "__scheme__", self.__mapper[key].scheme)
-                    kwargs[key] = instance
-            return func(reference, **kwargs, **k)
-        return wrapper
+        return self.compile(func)
+
+    ##
+    ## Generates the wrapper source once per decorated function, each scheme attribute
+    ## becomes a local lookup and a direct parse call and every Prototype parameter is
+    ## built through a generated __slots__ class, nothing walks the mapper per request
+    ##
+    def compile(self, func: Callable) -> Callable:
+        namespace: dict[str, Any] = { "func": func, "_raise": _raise }
+        lines = ["def wrapper(reference, package, **k):", "    get = package.get"]
+        arguments = list()
+        for index, (key, paramMap) in enumerate(self.__mapper.items()):
+            if paramMap.isproperty:
+                namespace[f"parse_{index}"] = paramMap.property.parse
+                lines.append(f"    value_{index} = parse_{index}(package[{key!r}])")
+            else:
+                namespace[f"Prototype_{index}"] = self.buildPrototype(paramMap)
+                values = list()
+                for position, (attr, property) in enumerate(paramMap.scheme.items()):
+                    name = f"value_{index}_{position}"
+                    namespace[f"parse_{index}_{position}"] = property.parse
+                    missing = "None" if property.arguments.get("optional", False) else f"_raise(KeyError({attr!r}))"
+                    lines.append(f"    {name} = get({attr!r})")
+                    lines.append(f"    {name} = parse_{index}_{position}({name}) if {name} else {missing}")
+                    values.append(name)
+                lines.append(f"    value_{index} = Prototype_{index}({', '.join(values)})")
+            arguments.append(f"{key}=value_{index}")
+        lines.append(f"    return func(reference, {''.join(argument + ', ' for argument in arguments)}**k)")
+        exec("\n".join(lines), namespace)
+        return wraps(func)(namespace["wrapper"])
+
+    def buildPrototype(self, paramMap: ParamMap) -> Type[Prototype]:
+        attributes = list(paramMap.scheme)
+        parameters = [f"value_{position}" for position in range(len(attributes))]
+        body = [f"    self.{attr} = {parameter}" for attr, parameter in zip(attributes, parameters)] or ["    pass"]
+        namespace: dict[str, Any] = dict()
+        exec("\n".join([f"def __init__(self, {', '.join(parameters)}):", *body]), namespace)
+        return type(paramMap.annotation.__name__, (Prototype,), {
+            "__slots__": tuple(attributes),
+            "__scheme__": paramMap.scheme,
+            "__init__": namespace["__init__"],
+        })
     
     def buildMapper(self, annotation: Type) -> ParamMap:
         bases = list(annotation.__mro__)
@@ -303,40 +798,240 @@ class PrototypeMap():
                     if isinstance(prop, Prototype.Property):
                         print(f"\t(*) Mapping attribute {key} as {prop.__class__}")
                         scheme[key] = prop
-        return ParamMap(isproperty=isproperty, property=property, scheme=scheme)
+        return ParamMap(isproperty=isproperty, property=property, scheme=scheme, annotation=annotation)
     
+## call returns None once the target ran, handlers that run it later return a Future the
+## server waits on before closing the connection the reply goes out on
 class MappedCallHandler():
     @abstractmethod
-    def call(self, code: Any, target: Callable, reference: Type, *args):
+    def call(self, code: Any, target: Callable, reference: Type, *args) -> Future | None:
         pass
 
 class SimpleCallHandler(MappedCallHandler):
-    def call(self, target: Callable, reference: Type, package: Any):
-        target(s=reference, package=package)
+    def call(self, code: Any, target: Callable, reference: Type, functionParameters: dict):
+        target(reference, **functionParameters)
+
+class OverflowPolicy(Enum):
+    BLOCK       = "block"
+    REJECT      = "reject"
+    DROP_OLDEST = "drop-oldest"
 
+class ConsumerMetrics():
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.waitTimeTotal = 0.0
+        self.waitTimeMax = 0.0
+        self.latencyTotal = 0.0
+        self.latencyMax = 0.0
+
+    def count(self, counter: str) -> None:
+        with self.__lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record(self, waitTime: float, latency: float, failed: bool) -> None:
+        with self.__lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self.waitTimeTotal += waitTime
+            self.waitTimeMax = max(self.waitTimeMax, waitTime)
+            self.latencyTotal += latency
+            self.latencyMax = max(self.latencyMax, latency)
+
+    def snapshot(self) -> dict[str, int | float]:
+        with self.__lock:
+            handled = self.completed + self.failed
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "dropped": self.dropped,
+                "waitTimeAvg": self.waitTimeTotal / handled if handled else 0.0,
+                "waitTimeMax": self.waitTimeMax,
+                "latencyAvg": self.latencyTotal / handled if handled else 0.0,
+                "latencyMax": self.latencyMax,
+            }
+
+##
+## Mapped calls are queued and run by a pool of consumer threads. With maxQueueSize the
+## queue is bounded and the overflowPolicy decides what a full queue does: BLOCK the
+## producer (the connection stops being read), REJECT the new call or DROP_OLDEST, the
+## refused call gets an error Package on its clientConnection. Calls made on an asyncio
+## event loop (AsyncQServer) never block it, BLOCK falls back to REJECT there. The pool starts with
+## consumersQuantity threads and grows up to maxConsumers while queued calls outnumber idle consumers,
+## extra consumers leave after idleTimeout seconds without work
+##
 class ConsumerFunctionHandler(MappedCallHandler, Generic[T]):
-    def __init__(self, consumersQuantity: int):
+    OVERLOADED_STATUS_CODE = 503
+
+    def __init__(self, consumersQuantity: int, maxConsumers: int = None, maxQueueSize: int = 0, overflowPolicy: OverflowPolicy = OverflowPolicy.BLOCK, idleTimeout: float = 5.0):
         self.__consumersQuantity = consumersQuantity
-        self.__pool: list[threading.Thread] = list()
-        self.__queue: Queue[T, Callable, tuple] = Queue()
+        self.__maxConsumers = max(maxConsumers or consumersQuantity, consumersQuantity)
+        self.__overflowPolicy = overflowPolicy
+        self.__idleTimeout = idleTimeout
+        self.__pool: set[threading.Thread] = set()
+        self.__poolLock = threading.Lock()
+        self.__busy = 0
+        self.__queue: Queue[tuple[T, Callable, Type, dict, float, Future]] = Queue(maxsize=maxQueueSize)
+        self.metrics = ConsumerMetrics()
 
         for _ in range(self.__consumersQuantity):
-            thread = threading.Thread(target=self.consume)
-            self.__pool.append(thread)
-            print(f"(+) Consumers thread started id: {id(thread)}")
-            thread.start()
+            self.__startConsumer()
+
+    def call(self, code: T, target: Callable, reference: Type, functionParameters: dict) -> Future:
+        self.metrics.count("submitted")
+        done = Future()
+        item = (code, target, reference, functionParameters, time.monotonic(), done)
+        overflowPolicy = self.__overflowPolicy
+        if overflowPolicy == OverflowPolicy.BLOCK and self.__onEventLoop():
+            overflowPolicy = OverflowPolicy.REJECT
+        if overflowPolicy == OverflowPolicy.BLOCK:
+            self.__queue.put(item)
+        elif overflowPolicy == OverflowPolicy.REJECT:
+            try:
+                self.__queue.put_nowait(item)
+            except Full:
+                self.metrics.count("rejected")
+                self.reject(functionParameters)
+                done.set_result(None)
+        else:
+            while True:
+                try:
+                    self.__queue.put_nowait(item)
+                    break
+                except Full:
+                    try:
+                        dropped = self.__queue.get_nowait()
+                        self.__queue.task_done()
+                    except Empty:
+                        continue
+                    self.metrics.count("dropped")
+                    self.reject(dropped[3])
+                    dropped[5].set_result(None)
+        self.__scale()
+        return done
 
-    def call(self, code: T, target: Callable, reference: Type, functionParameters: dict):
-        self.__queue.put((code, target, reference, functionParameters))
-        return super().call(code, target, functionParameters)
+    def reject(self, functionParameters: dict):
+        clientConnection: ClientConnection = functionParameters.get("clientConnection")
+        if clientConnection is None:
+            return
+        try:
+            clientConnection.sendPackage(JsonPackage(payload={}, msg="Server overloaded, request refused", statusCode=ConsumerFunctionHandler.OVERLOADED_STATUS_CODE))
+        except OSError as e:
+            dprint(f"(-) Could not send overload package: {e}")
 
     def consume(self):
         while True:
-            code, target, reference, args = self.__queue.get()
-            target(s=reference, **args)
+            try:
+                code, target, reference, args, queuedAt, done = self.__queue.get(timeout=self.__idleTimeout)
+            except Empty:
+                with self.__poolLock:
+                    if len(self.__pool) > self.__consumersQuantity:
+                        self.__pool.discard(threading.current_thread())
+                        print(f"(-) Consumers thread stopped id: {id(threading.current_thread())}")
+                        return
+                continue
+            with self.__poolLock:
+                self.__busy += 1
+            startedAt = time.monotonic()
+            failed = False
+            try:
+                target(reference, **args)
+            except Exception as e:
+                failed = True
+                print(f"(-) Mapped function {getattr(target, '__name__', target)} failed with code {code}: {e}")
+            finally:
+                self.metrics.record(startedAt - queuedAt, time.monotonic() - startedAt, failed)
+                with self.__poolLock:
+                    self.__busy -= 1
+                self.__queue.task_done()
+                done.set_result(None)
+
+    def getMetrics(self) -> dict[str, int | float]:
+        with self.__poolLock:
+            poolSize, busy = len(self.__pool), self.__busy
+        return {
+            **self.metrics.snapshot(),
+            "queueDepth": self.__queue.qsize(),
+            "poolSize": poolSize,
+            "busy": busy,
+        }
+
+    @staticmethod
+    def __onEventLoop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def __scale(self):
+        depth = self.__queue.qsize()
+        if depth == 0:
+            return
+        with self.__poolLock:
+            if depth > len(self.__pool) - self.__busy and len(self.__pool) < self.__maxConsumers:
+                self.__startConsumer()
+
+    def __startConsumer(self):
+        thread = threading.Thread(target=self.consume, daemon=True)
+        self.__pool.add(thread)
+        print(f"(+) Consumers thread started id: {id(thread)}")
+        thread.start()
+
+##
+## Open connections in least recently active order. When maxConnections is reached the
+## oldest connection that is idle, waiting for its next package, is shut down to make room.
+## If every connection is busy the new one is refused
+##
+class ConnectionTracker():
+    def __init__(self, maxConnections: int = None):
+        self.maxConnections = maxConnections
+        self.__connections: OrderedDict[ClientConnection, bool] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def add(self, clientConnection: ClientConnection) -> bool:
+        evicted = None
+        with self.__lock:
+            if self.maxConnections and len(self.__connections) >= self.maxConnections:
+                evicted = next((connection for connection, busy in self.__connections.items() if not busy), None)
+                if evicted is None:
+                    return False
+                del self.__connections[evicted]
+            self.__connections[clientConnection] = False
+        if evicted is not None:
+            dprint("(-) Evicting idle connection to make room")
+            evicted.shutdown()
+        return True
+
+    def touch(self, clientConnection: ClientConnection, busy: bool) -> None:
+        with self.__lock:
+            if clientConnection in self.__connections:
+                self.__connections[clientConnection] = busy
+                self.__connections.move_to_end(clientConnection)
+
+    def remove(self, clientConnection: ClientConnection) -> None:
+        with self.__lock:
+            self.__connections.pop(clientConnection, None)
+
+    def __len__(self) -> int:
+        return len(self.__connections)
 
 class QServer():
-    def __init__(self, interface: str, port: int, keepAlive: bool = False, mappedFunctionHandler: MappedCallHandler = SimpleCallHandler(), messagePolicy: MessagePolicy = FixedSizeMessagePolicy() ) -> None:
+    dispatchTable: DispatchTable = DispatchTable({})
+
+    def __init_subclass__(cls, **k) -> None:
+        super().__init_subclass__(**k)
+        cls.dispatchTable = DispatchTable.fromClass(cls)
+
+    def __init__(self, interface: str, port: int, keepAlive: bool = False, mappedFunctionHandler: MappedCallHandler = SimpleCallHandler(), messagePolicy: MessagePolicy = FixedSizeMessagePolicy(), idleTimeout: float = None, maxConnections: int = None) -> None:
         self.__port = port
         self.__inteface = interface
         self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -344,10 +1039,13 @@ class QServer():
         self.__newConnectionDecoder:    Callable = None
         self.__newConnectionLoader:     Callable = None
         self.__newConnectionValueMap:   Callable = None
+        self.__codecs:                  list[Codec] = list()
 
         self.__mappedFunctionHandler = mappedFunctionHandler
         self.__messagePolicy: MessagePolicy = messagePolicy
         self.__keepAlive = keepAlive
+        self.__idleTimeout = idleTimeout
+        self.__connections = ConnectionTracker(maxConnections)
 
     def start(self) -> None:
         self.__socket.bind((self.__inteface, self.__port))
@@ -355,60 +1053,182 @@ class QServer():
         print(f"(+) Server started on {self.__inteface}:{self.__port}")
         while True:
             client_socket, address = self.__socket.accept()
-            print(f"(+) Connection from {address}")
-            self.onClientConnection(ClientConnection(client_socket, address, messagePolicy=self.__messagePolicy))
+            dprint(f"(+) Connection from {address}")
+            client_socket.settimeout(self.__idleTimeout)
+            clientConnection = ClientConnection(client_socket, address, messagePolicy=self.__messagePolicy)
+            if not self.__connections.add(clientConnection):
+                print(f"(-) Connection limit reached, refusing {address}")
+                clientConnection.close()
+                continue
+            self.onClientConnection(clientConnection)
 
     def setOnNewConnection(self, decoder: Callable, loader: Callable, valueMap: Callable) -> None:
         self.__newConnectionDecoder  = decoder
         self.__newConnectionLoader   = loader
         self.__newConnectionValueMap = valueMap
 
+    ## replaces the decoder and loader, each package is loaded by the codec it was sent with
+    def setCodecs(self, *codecs: Codec) -> None:
+        self.__codecs = list(codecs)
+
+    ## an empty package means the client closed, idleTimeout bounds the wait for the next one.
+    ## Calls still queued in the handler are waited for so their replies are not cut off
     def onClientConnection(self, clientConnection: ClientConnection):
-        keepAlive = self.__keepAlive
-        patience = 5
-        patienceCount = 0
-        while keepAlive and (patienceCount <= patience):
-            pack = clientConnection.package()
-            if len(pack) == 0:
-                patienceCount += 1
-            else:
-                # create a method to decode using the package
-                if self.__newConnectionDecoder:
-                    decodePackage = self.__newConnectionDecoder(pack)
-                    
-                # create a method to load using the package
-                if self.__newConnectionLoader:
-                    loadPackage = self.__newConnectionLoader(decodePackage)
-                    
-                # create a method to map using the package
-                if self.__newConnectionValueMap:
-                    mappedCode = self.__newConnectionValueMap(loadPackage)
-
-                print(f"(+) Sending to mapped function")
-                self.onMappedCode(code=mappedCode, clientConnection=clientConnection, package=loadPackage)
-        print("closing socket")
-        clientConnection.close()
-        print("(+) Connection closed")
+        pending: set[Future] = set()
+        try:
+            while True:
+                self.__connections.touch(clientConnection, busy=False)
+                pack = clientConnection.package()
+                if len(pack) == 0:
+                    break
+                self.__connections.touch(clientConnection, busy=True)
+                call = self.onPackage(pack, clientConnection)
+                pending = { future for future in pending if not future.done() }
+                if call is not None:
+                    pending.add(call)
+                if not self.__keepAlive:
+                    break
+        except TimeoutError:
+            dprint(f"(-) Connection idle for more than {self.__idleTimeout}s")
+        except ValueError as e:
+            dprint(f"(-) Malformed frame: {e}")
+        except OSError as e:
+            dprint(f"(-) Connection error: {e}")
+        finally:
+            if pending:
+                wait(pending, timeout=self.__idleTimeout)
+            self.__connections.remove(clientConnection)
+            dprint("closing socket")
+            clientConnection.close()
+            dprint("(+) Connection closed")
         return None
     
-    def onMappedCode(self, code: Any, **k):
-        mappedFunction = Map.getMappedFunction(code)
-        self.__mappedFunctionHandler.call(code, mappedFunction, self, k)
+    ## returns the Future of a call the handler has not run yet, None once it ran
+    def onPackage(self, pack: bytes, clientConnection: ClientConnection) -> Future | None:
+        decodePackage = pack
+        loadPackage = pack
+        mappedCode = None
+        if self.__codecs:
+            clientConnection.codec = Codec.negotiate(pack, self.__codecs)
+            loadPackage = clientConnection.codec.decode(pack)
+        else:
+            # create a method to decode using the package
+            if self.__newConnectionDecoder:
+                decodePackage = self.__newConnectionDecoder(pack)
+                loadPackage = decodePackage
+
+            # create a method to load using the package
+            if self.__newConnectionLoader:
+                loadPackage = self.__newConnectionLoader(decodePackage)
+
+        # create a method to map using the package
+        if self.__newConnectionValueMap:
+            mappedCode = self.__newConnectionValueMap(loadPackage)
+
+        dprint(f"(+) Sending to mapped function")
+        return self.onMappedCode(code=mappedCode, clientConnection=clientConnection, package=loadPackage)
+
+    def onMappedCode(self, code: Any, **k) -> Future | None:
+        mappedFunction = self.dispatchTable.get(code)
+        return self.__mappedFunctionHandler.call(code, mappedFunction, self, k)
 
     def setMessagePolicy(self, messagePolicy: MessagePolicy):
         self.__messagePolicy = messagePolicy
 
+    def getMessagePolicy(self) -> MessagePolicy:
+        return self.__messagePolicy
+
+    def getAddress(self) -> tuple[str, int]:
+        return (self.__inteface, self.__port)
+
+    def isKeepAlive(self) -> bool:
+        return self.__keepAlive
+
+    def getIdleTimeout(self) -> float | None:
+        return self.__idleTimeout
+
+    def getConnections(self) -> ConnectionTracker:
+        return self.__connections
+
 class QuickServer(QServer):
     @Thread()
     def onClientConnection(self, clientConnection: ClientConnection):
         return super().onClientConnection(clientConnection)
 
-def utf8Decoder(bytes: bytes) -> str:
-    return bytes.decode("utf-8")
+##
+## Single threaded event loop engine, every connection is a coroutine waiting on the
+## stream reader instead of an OS thread blocked on recv, idle keep-alive connections
+## only cost their buffers. Mapped functions are dispatched with the same handler,
+## blocking handlers should be used with the ConsumerFunctionHandler
+##
+class AsyncQServer(QServer):
+    def __init__(self, interface: str, port: int, keepAlive: bool = False, mappedFunctionHandler: MappedCallHandler = SimpleCallHandler(), messagePolicy: MessagePolicy = FixedSizeMessagePolicy(), idleTimeout: float = None, maxConnections: int = None, backlog: int = 1024) -> None:
+        self.__backlog = backlog
+        super().__init__(interface, port, keepAlive=keepAlive, mappedFunctionHandler=mappedFunctionHandler, messagePolicy=messagePolicy, idleTimeout=idleTimeout, maxConnections=maxConnections)
+
+    def start(self) -> None:
+        asyncio.run(self.serve())
+
+    async def serve(self) -> None:
+        interface, port = self.getAddress()
+        limit = self.getMessagePolicy().readerLimit() if self.getMessagePolicy() else 64 * 1024
+        server = await asyncio.start_server(self.onAsyncClientConnection, host=interface, port=port, backlog=self.__backlog, limit=limit)
+        print(f"(+) Async server started on {interface}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    async def onAsyncClientConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        address = writer.get_extra_info("peername")
+        dprint(f"(+) Connection from {address}")
+        clientConnection = AsyncClientConnection(reader, writer, address, messagePolicy=self.getMessagePolicy())
+        connections = self.getConnections()
+        if not connections.add(clientConnection):
+            dprint(f"(-) Connection limit reached, refusing {address}")
+            clientConnection.close()
+            return
+        keepAlive = True
+        pending: set[Future] = set()
+        try:
+            while keepAlive:
+                connections.touch(clientConnection, busy=False)
+                pack = await asyncio.wait_for(clientConnection.package(), self.getIdleTimeout())
+                if len(pack) == 0:
+                    break
+                connections.touch(clientConnection, busy=True)
+                call = self.onPackage(pack, clientConnection)
+                pending = { future for future in pending if not future.done() }
+                if call is not None:
+                    pending.add(call)
+                await clientConnection.drain()
+                keepAlive = self.isKeepAlive()
+        except TimeoutError:
+            dprint(f"(-) Connection from {address} idle for more than {self.getIdleTimeout()}s")
+        except ValueError as e:
+            dprint(f"(-) Malformed frame from {address}: {e}")
+        except ConnectionError as e:
+            dprint(f"(-) Connection error from {address}: {e}")
+        finally:
+            ## replies of queued calls are scheduled on the loop before their future resolves
+            if pending:
+                await asyncio.wait([ asyncio.wrap_future(future) for future in pending ], timeout=self.getIdleTimeout())
+            connections.remove(clientConnection)
+            clientConnection.close()
+        dprint("(+) Connection closed")
+
+def utf8Decoder(bytes: bytes | memoryview) -> str:
+    return str(bytes, "utf-8")
 
 def jsonLoader(data: str) -> dict:
     return json.loads(data)
 
+def rawDecoder(bytes: bytes | memoryview) -> bytes | memoryview:
+    return bytes
+
+def codecLoader(codec: Codec) -> Callable:
+    def _load(data: bytes | memoryview) -> Any:
+        return codec.decode(data)
+    return _load
+
 def keyMap(key: str) -> Callable:
     def _map(dictionary: dict) -> str:
         return dictionary[key]
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import threading
+import time
+import timeit
+from datetime import datetime
+from QServer import *
+
+class BenchmarkPeer(Prototype):
+    name        = Prototype.String(minSize=3, maxSize=100)
+    ip          = Prototype.String(pattern=r"^\d{1,3}(\.\d{1,3}){3}$")
+    createdAt   = Prototype.DateTime()
+    updatedAt   = Prototype.DateTime()
+    meta        = Prototype.Dict()
+    ports       = Prototype.Dict()
+
+class BenchmarkHandlers():
+    @PrototypeMap()
+    def registerIdentity(self, peer: BenchmarkPeer, keysDir: Prototype.String):
+        return peer
+
+    @PrototypeMap()
+    def removedPeer(self, uuid: Prototype.String):
+        return uuid
+
+PACKAGE = {
+    "messageType": 9,
+    "name": "Alice",
+    "ip": "123.0.3.1",
+    "uuid": "54542165456-56456465-84745",
+    "createdAt": "2024-12-27 19:50:18",
+    "updatedAt": "2024-12-27 19:50:18",
+    "meta": { "peerPublicKey": "", "peerHash": "" },
+    "ports": { "udhtSync": "8080", "fdhtSync": "8081", "service": "8082" },
+    "keysDir": "data/identity/"
+}
+
+def measure(name: str, statement: Callable, number: int) -> None:
+    best = min(timeit.repeat(statement, number=number, repeat=5))
+    print(f"{name:<32} {best / number * 1e9:>10.0f} ns/call")
+
+def prototypeBinding(number: int = 100000) -> None:
+    handlers = BenchmarkHandlers()
+    peer = handlers.registerIdentity(PACKAGE)
+    ## datetime parsing dominates a full Peer, the String only binding isolates the mapper overhead
+    measure("registerIdentity bind", lambda: handlers.registerIdentity(PACKAGE), number // 10)
+    measure("removedPeer bind", lambda: handlers.removedPeer(PACKAGE), number)
+    measure("Peer isValid", peer.isValid, number)
+
+def codecs(number: int = 20000) -> None:
+    available: list[Codec] = [JsonCodec()]
+    if msgpack is not None:
+        available.append(MsgpackCodec())
+    response = JsonPackage(payload=PACKAGE, msg="Created with success on directory", statusCode=1).content()
+    for codec in available:
+        encoded = codec.encode(PACKAGE)
+        print(f"{codec.name} request size: {len(encoded)} bytes")
+        measure(f"{codec.name} encode response", lambda: codec.encode(response), number)
+        measure(f"{codec.name} decode request", lambda: codec.decode(encoded), number)
+
+class EchoServerMap(QuickServerMap):
+    ECHO = 1
+
+def echo(self, clientConnection: ClientConnection, payload: Prototype.String):
+    clientConnection.sendPackage(JsonPackage(payload=payload, msg="echo", statusCode=1))
+
+class EchoQServer(QServer):
+    echo = Map[int](EchoServerMap.ECHO)(PrototypeMap()(echo))
+
+class EchoQuickServer(QuickServer):
+    echo = EchoQServer.echo
+
+class EchoAsyncQServer(AsyncQServer):
+    echo = EchoQServer.echo
+
+ENGINES: dict[str, Type[QServer]] = { "QServer": EchoQServer, "QuickServer": EchoQuickServer, "AsyncQServer": EchoAsyncQServer }
+HANDLERS: dict[str, Callable[[], MappedCallHandler]] = {
+    "simple": SimpleCallHandler,
+    "consumer": lambda: ConsumerFunctionHandler(consumersQuantity=4, maxConsumers=16),
+}
+
+def freePort() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def startServer(engine: str, handler: str) -> int:
+    port = freePort()
+    server = ENGINES[engine]("127.0.0.1", port, keepAlive=True, mappedFunctionHandler=HANDLERS[handler](), messagePolicy=HeaderMessagePolicy())
+    server.setOnNewConnection(decoder=utf8Decoder, loader=jsonLoader, valueMap=keyMap("messageType"))
+    threading.Thread(target=server.start, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return port
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{engine} did not start on port {port}")
+
+def percentile(latencies: list[float], quantile: float) -> float:
+    return latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+
+## QServer serves one connection at a time, so clients queued behind it give up on the barrier instead of deadlocking
+def runClient(port: int, message: bytes, requests: int, warmup: int, barrier: threading.Barrier, latencies: list[float], window: list[float], errors: list[str]) -> None:
+    policy = HeaderMessagePolicy()
+    reader = BufferedHeaderMessagePolicy()
+    frame = policy.buildPackage(message)
+    measured: list[float] = list()
+    try:
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            for _ in range(warmup):
+                sock.sendall(frame)
+                reader.receivePackage(sock)
+            try:
+                barrier.wait(timeout=1)
+            except threading.BrokenBarrierError:
+                pass
+            window.append(time.perf_counter())
+            for _ in range(requests):
+                startedAt = time.perf_counter()
+                sock.sendall(frame)
+                if len(reader.receivePackage(sock)) == 0:
+                    raise ConnectionError("server closed the connection")
+                measured.append(time.perf_counter() - startedAt)
+            window.append(time.perf_counter())
+    except Exception as e:
+        errors.append(str(e))
+    latencies.extend(measured)
+
+def loadScenario(engine: str, handler: str, size: int, clients: int, requests: int, warmup: int) -> dict[str, Any]:
+    port = startServer(engine, handler)
+    message = json.dumps({ "messageType": EchoServerMap.ECHO, "payload": "x" * size }).encode("utf-8")
+    barrier = threading.Barrier(clients)
+    latencies: list[float] = list()
+    window: list[float] = list()
+    errors: list[str] = list()
+    threads = [threading.Thread(target=runClient, args=(port, message, requests, warmup, barrier, latencies, window, errors), daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(window) - min(window) if window else 0.0
+    latencies.sort()
+    result = {
+        "engine": engine,
+        "handler": handler,
+        "messageSize": size,
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50) if latencies else None,
+        "p99": percentile(latencies, 0.99) if latencies else None,
+        "p999": percentile(latencies, 0.999) if latencies else None,
+    }
+    print(f"{engine:<13} {handler:<9} {size:>7}B {result['throughput']:>10.0f} req/s  p50 {formatLatency(result['p50'])}  p99 {formatLatency(result['p99'])}  p999 {formatLatency(result['p999'])}  errors {len(errors)}")
+    return result
+
+def formatLatency(latency: float | None) -> str:
+    return f"{latency * 1e6:>9.0f}us" if latency is not None else "        -"
+
+def gitCommit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load(arguments: argparse.Namespace) -> None:
+    results = [
+        loadScenario(engine, handler, size, arguments.clients, arguments.requests, arguments.warmup)
+        for engine in arguments.engines
+        for handler in arguments.handlers
+        for size in arguments.sizes
+    ]
+    if arguments.output:
+        report = {
+            "commit": gitCommit(),
+            "createdAt": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "clients": arguments.clients,
+            "requestsPerClient": arguments.requests,
+            "results": results,
+        }
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=4)
+        print(f"(+) Report written to {arguments.output}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="QServer micro and load benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    prototype = commands.add_parser("prototype", help="PrototypeMap argument binding")
+    prototype.add_argument("--number", type=int, default=100000)
+    codec = commands.add_parser("codecs", help="package codecs encode/decode")
+    codec.add_argument("--number", type=int, default=20000)
+    loadParser = commands.add_parser("load", help="loopback request/response load test")
+    loadParser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=["QuickServer", "AsyncQServer"])
+    loadParser.add_argument("--handlers", nargs="+", choices=list(HANDLERS), default=list(HANDLERS))
+    loadParser.add_argument("--sizes", nargs="+", type=int, default=[64, 1024, 16384])
+    loadParser.add_argument("--clients", type=int, default=16)
+    loadParser.add_argument("--requests", type=int, default=500, help="requests per client")
+    loadParser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per client")
+    loadParser.add_argument("--output", help="write a JSON report to compare across commits")
+    arguments = parser.parse_args()
+
+    if arguments.command == "prototype":
+        prototypeBinding(arguments.number)
+    elif arguments.command == "codecs":
+        codecs(arguments.number)
+    else:
+        load(arguments)
+
+if __name__ == "__main__":
+    main()
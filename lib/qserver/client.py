@@ -1,6 +1,5 @@
-import json
 import socket
-from QServer import HeaderMessagePolicy
+from QServer import HeaderMessagePolicy, JsonCodec, MsgpackCodec, msgpack
 
 def main():
     host = '127.0.0.1'
@@ -33,11 +32,13 @@ def main():
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     client_socket.connect((host, port))
     messagePolicy = HeaderMessagePolicy()
+    ## the server negotiates the codec per package, msgpack is smaller and cheaper to parse
+    codec = MsgpackCodec() if msgpack is not None else JsonCodec()
 
     try:
         #client_socket.sendall(messagePolicy.buildPackage(json.dumps(message__add).encode()))
         #client_socket.sendall(messagePolicy.buildPackage(json.dumps(message_remove).encode()))
-        client_socket.sendall(messagePolicy.buildPackage(json.dumps(message__add).encode()))
+        client_socket.sendall(messagePolicy.buildPackage(codec.encode(message__add)))
     except Exception as e:
         print(f'An error occurred: {e}')
 
@@ -19,7 +19,7 @@ class Peer(Prototype):
         service  = Prototype.String(pattern="")
     )
 
-class Server(QuickServer):
+class Server(AsyncQServer):
     IDENTITY_DIRECTORY = "data/identity/"
     class ServerMap(QuickServerMap):
         SEND_HASH_TABLE = 2
@@ -76,8 +76,10 @@ class Server(QuickServer):
         return super().start()
 
 if __name__ == "__main__":
-    server = Server(interface="127.0.0.1", port=8000, keepAlive=True, mappedFunctionHandler=ConsumerFunctionHandler(consumersQuantity=5))
+    server = Server(interface="127.0.0.1", port=8000, keepAlive=True, idleTimeout=60, maxConnections=10000, mappedFunctionHandler=ConsumerFunctionHandler(consumersQuantity=5, maxConsumers=20, maxQueueSize=1000, overflowPolicy=OverflowPolicy.REJECT))
     server.setOnNewConnection(decoder=utf8Decoder, loader=jsonLoader, valueMap=keyMap("messageType"))
     server.setMessagePolicy(HeaderMessagePolicy())
+    ## each package is decoded with the codec it was sent with, JSON clients keep working
+    server.setCodecs(*([MsgpackCodec()] if msgpack is not None else []), JsonCodec())
     server.start()
     sys.exit(0)
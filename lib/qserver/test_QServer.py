@@ -0,0 +1,65 @@
+import json
+import socket
+import threading
+import time
+import unittest
+from QServer import *
+
+class ReplyServerMap(QuickServerMap):
+    REPLY = 1
+
+## slow enough that the reply is still queued when the server loop is done with the package
+def reply(self, clientConnection: ClientConnection, payload: Prototype.String):
+    time.sleep(0.2)
+    clientConnection.sendPackage(JsonPackage(payload=payload, msg="reply", statusCode=1))
+
+class ReplyQuickServer(QuickServer):
+    reply = Map[int](ReplyServerMap.REPLY)(PrototypeMap()(reply))
+
+class ReplyAsyncQServer(AsyncQServer):
+    reply = ReplyQuickServer.reply
+
+def startServer(engine: Type[QServer], messagePolicy: MessagePolicy = None) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = engine("127.0.0.1", port, keepAlive=False, mappedFunctionHandler=ConsumerFunctionHandler(consumersQuantity=2), messagePolicy=messagePolicy or HeaderMessagePolicy())
+    server.setOnNewConnection(decoder=utf8Decoder, loader=jsonLoader, valueMap=keyMap("messageType"))
+    threading.Thread(target=server.start, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return port
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{engine.__name__} did not start on port {port}")
+
+class KeepAliveOffTest(unittest.TestCase):
+    def request(self, port: int) -> dict:
+        policy = HeaderMessagePolicy()
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+            sock.sendall(policy.buildPackage(json.dumps({ "messageType": 1, "payload": "hello" }).encode()))
+            return json.loads(policy.receivePackage(sock))
+
+    def testQuickServerRepliesBeforeClosing(self):
+        self.assertEqual(self.request(startServer(ReplyQuickServer))["payload"], "hello")
+
+    def testAsyncQServerRepliesBeforeClosing(self):
+        self.assertEqual(self.request(startServer(ReplyAsyncQServer))["payload"], "hello")
+
+class AsyncDelimiterTest(unittest.TestCase):
+    def request(self, port: int, payload: str) -> bytes:
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+            sock.sendall(json.dumps({ "messageType": 1, "payload": payload }).encode() + b"\n")
+            return sock.makefile("rb").readline()
+
+    def testFramesOverTheStreamReaderDefaultLimit(self):
+        port = startServer(ReplyAsyncQServer, DelimiterMessagePolicy(maxSize=200 * 1024))
+        self.assertEqual(json.loads(self.request(port, "x" * 100 * 1024))["payload"], "x" * 100 * 1024)
+
+    def testFramesOverMaxSizeCloseTheConnection(self):
+        port = startServer(ReplyAsyncQServer, DelimiterMessagePolicy(maxSize=32 * 1024))
+        self.assertEqual(self.request(port, "x" * 100 * 1024), b"")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,4 +5,25 @@ SOCKET_CONNECTION_LIMIT=10
 THREAD_POOL_LIMIT = 10
 
 SCHEDULER_TABLE_SYNC_JOB_HOUR_INTERVAL=5
-SCHEDULER_PEER_SYNC_JOB_HOUR_INTERVAL=100
\ No newline at end of file
+SCHEDULER_PEER_SYNC_JOB_HOUR_INTERVAL=100
+
+PEER_SYNC_WORKERS=32
+PEER_SYNC_RETRIES=3
+PEER_SYNC_BACKOFF=0.5
+PEER_SYNC_CONNECT_TIMEOUT=3
+PEER_SYNC_READ_TIMEOUT=10
+
+## leaves of the anti-entropy tree are 16**MERKLE_DEPTH hash ranges
+MERKLE_DEPTH=4
+
+## entries per udht BATCH request pushed by TableSyncJob
+TABLE_SYNC_BATCH_SIZE=500
+
+## pooled keep-alive connections to the manager service
+TCP_POOL_SIZE=4
+TCP_CONNECT_TIMEOUT=3
+TCP_READ_TIMEOUT=30
+TCP_IDLE_TIMEOUT=60
+REST_POOL_CONNECTIONS=4
+REST_POOL_SIZE=8
+REST_MAX_RETRIES=2
\ No newline at end of file
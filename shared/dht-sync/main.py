@@ -1,15 +1,23 @@
 from apscheduler.schedulers.background import BackgroundScheduler
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from abc import ABC, abstractmethod
-from typing import Any, Type
+from typing import Any, Callable, Type
 import requests
+import requests.adapters
 import datetime
 import logging
 import threading
+import random
+import time
 import globals
+from merkle import MerkleTree
+from pool import PooledSocket, SocketPool
 import yaml
 import socket
 import pickle
+import struct
 import json
+import string
 
 class HashTableConnection(ABC):
     def __init__(self, address: tuple[str, int], *args, **kwd) -> None:
@@ -19,103 +27,307 @@ class HashTableConnection(ABC):
     def get_adress(self) -> tuple[str, int]:
         return self.__address
     
+    ## returns False when the service received the entry and refused it, raises when it
+    ## could not be delivered
     @abstractmethod
-    def send_hashtable_entry(self, entry: dict) -> None:
+    def send_hashtable_entry(self, entry: dict) -> bool | None:
         pass
+    
+    ## pushes many entries, one result per entry: True acknowledged, False refused by the
+    ## service and None not delivered. Connections without a bulk request fall back to one
+    ## send_hashtable_entry per entry
+    def send_hashtable_entries(self, entries: list[dict]) -> list[bool | None]:
+        results = list()
+        for entry in entries:
+            try:
+                results.append(self.send_hashtable_entry(entry) is not False)
+            except Exception as e:
+                Server.logger.error(f"Could not send entry {entry.get('peer_id')} --resolution: {e}")
+                results.append(None)
+        return results
             
     @abstractmethod
     def receive_hashtable(self, payload: Any) -> dict[str, dict]:
         pass
 
 ## This class refers not with a connection with the peer but a connnection 
-## with the microservice to load the user hashtable
+## with the microservice to load the user hashtable. Sockets come from a SocketPool
+## shared by every connection to the same address, with keep alive they go back to
+## the pool after each call, a reused socket that turns out to be dead is replaced
+## and the call retried once
 class TCPHashtableConnection(HashTableConnection):
     def __init__(self, address: tuple[str, int], encoding: str = globals.ENCODING) -> None:
-        self.__sock                 = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.__address              = address
         self.__encoding             = encoding
         self.__keep_alive           = False
-        self.__connected            = False
+        self.__pool                 = SocketPool.get(address, globals.TCP_POOL_SIZE, globals.TCP_CONNECT_TIMEOUT, globals.TCP_READ_TIMEOUT, globals.TCP_IDLE_TIMEOUT)
         self.__entry_payload        = { "message_type": 3, "data": {} }
         self.__hashtable_payload    = { "message_type": 2 }
-        self.__close_payload        = { "message_type": 1 }
+        self.__batch_payload        = { "message_type": 10, "data": { "operations": [] } }
+        self.__close_payload        = json.dumps({ "message_type": 1 }).encode(self.__encoding) + b'\n'
+    
+    def __call(self, operation: Callable[[PooledSocket], Any]) -> Any:
+        while True:
+            connection = self.__pool.acquire()
+            try:
+                result = operation(connection)
+            except (OSError, ValueError) as e:
+                self.__pool.discard(connection)
+                if not connection.reused:
+                    raise
+                Server.logger.warning(f'Pooled tcp-connection to {self.__address} was stale --resolution: reconnecting: {e}')
+                continue
+            if self.__keep_alive:
+                self.__pool.release(connection)
+            else:
+                self.__pool.discard(connection, self.__close_payload)
+            return result
+    
+    ## json responses are newline terminated and the hashtable arrives as length framed
+    ## pages on the same stream, both are read through the socket's buffered reader
+    def __request(self, connection: PooledSocket, payload: dict) -> dict:
+        connection.sock.sendall(json.dumps(payload).encode(self.__encoding) + b'\n')
+        response = connection.reader.readline()
+        if not response.endswith(b'\n'):
+            raise ConnectionError(f"{self.__address} closed the connection before answering")
+        return json.loads(response.decode(self.__encoding))
         
     def receive_hashtable(self) -> dict[str, dict]:
-        if self.__connected == False:
-            Server.logger.info(f'Attemping tcp-connection to: {self.__address}')
-            self.__sock.connect(self.__address)
-            self.__connected = True
         Server.logger.info(f'Sending {self.__hashtable_payload} with tcp-connection to: {self.__address} with encoding {self.__encoding}')
-        self.__sock.sendall(json.dumps(self.__hashtable_payload).encode(self.__encoding))
-        hashtable = self.__sock.recv(1024)
-        if self.__keep_alive == False and self.__connected:
-            self.close()
-        return pickle.loads(hashtable)
+        return self.__call(self.__receive_hashtable)
+    
+    def __receive_hashtable(self, connection: PooledSocket) -> dict[str, dict]:
+        connection.sock.sendall(json.dumps(self.__hashtable_payload).encode(self.__encoding) + b'\n')
+        hashtable = dict()
+        while True:
+            page = pickle.loads(self.__receive_frame(connection))
+            hashtable.update(page["peers"])
+            if page["cursor"] is None:
+                return hashtable
+    
+    ## the manager streams the table as length framed pages, see udht SEND_HASH_TABLE
+    def __receive_frame(self, connection: PooledSocket) -> bytes:
+        size = struct.unpack(">I", self.__receive_exactly(connection, 4))[0]
+        return self.__receive_exactly(connection, size)
+    
+    def __receive_exactly(self, connection: PooledSocket, size: int) -> bytes:
+        data = connection.reader.read(size)
+        if len(data) < size:
+            raise ConnectionError(f"{self.__address} closed the connection while streaming the hashtable")
+        return data
     
     def send_hashtable_entry(self, entry: dict) -> None:
-        if self.__connected == False:
-            Server.logger.info(f'Attemping tcp-connection to: {self.__address}')
-            self.__sock.connect(self.__address)
-            self.__connected = True
         self.__entry_payload['data'] = entry
-        data = json.dumps(self.__entry_payload).encode(self.__encoding)
-        Server.logger.info(f'Sending {data} with tcp-connection to: {self.__address} with encoding {self.__encoding}')
-        self.__sock.send(data + b'\n')
-        response = self.__sock.recv(1024)
+        response = self.__call(lambda connection: self.__request(connection, self.__entry_payload))
         Server.logger.info(f'Received {response} from service --resolution: finish method')
-        if self.__keep_alive == False and self.__connected:
-            self.close()
+    
+    ## one udht BATCH request adds every entry, the ones already registered are sent again
+    ## as updates in a second request
+    def send_hashtable_entries(self, entries: list[dict]) -> list[bool]:
+        return self.__call(lambda connection: self.__send_hashtable_entries(connection, entries))
+    
+    def __send_hashtable_entries(self, connection: PooledSocket, entries: list[dict]) -> list[bool]:
+        results = self.__batch(connection, [ ("add", entry) for entry in entries ])
+        existing = [ index for index, result in enumerate(results) if not result ]
+        if existing:
+            updates = self.__batch(connection, [ ("update", entries[index]) for index in existing ])
+            for index, result in zip(existing, updates):
+                results[index] = result
+        return results
+    
+    def __batch(self, connection: PooledSocket, operations: list[tuple[str, dict]]) -> list[bool]:
+        self.__batch_payload['data']['operations'] = [ { "op": operation, "data": entry } for operation, entry in operations ]
+        response = self.__request(connection, self.__batch_payload)
+        if response.get("result") != "completed" or len(response.get("data") or []) != len(operations):
+            raise ConnectionError(f"{self.__address} did not acknowledge the batch: {response.get('result')}")
+        return response["data"]
             
     def set_keep_alive(self, keep: bool) -> None:
         self.__keep_alive = keep
-        
+    
+    ## closes the idle pooled sockets, the next call opens a new one
     def close(self) -> None:
         Server.logger.info(f'Attemping to close tcp-connection: {self.__address}')
-        if self.__connected:
-            self.__sock.sendall(json.dumps(self.__close_payload).encode(self.__encoding))
-            self.__sock.close()
-            self.__connected = False
+        self.__pool.close(self.__close_payload)
             
+## One requests.Session is shared by every REST connection so HTTP keep-alive sockets
+## are reused across calls, the adapter bounds how many are kept per host
 class RESTHashtableConnection(HashTableConnection):
+    __session: requests.Session | None = None
+    __session_lock = threading.Lock()
+    
     def __init__(self, address: tuple[str, int], *args, **kwd) -> None:
         self.__url = f"http://{address[0]}:{address[1]}/hashtable"
+        self.__timeout = (globals.TCP_CONNECT_TIMEOUT, globals.TCP_READ_TIMEOUT)
         super().__init__(address, *args, **kwd)
+    
+    @staticmethod
+    def get_session() -> requests.Session:
+        with RESTHashtableConnection.__session_lock:
+            if RESTHashtableConnection.__session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=globals.REST_POOL_CONNECTIONS, pool_maxsize=globals.REST_POOL_SIZE, max_retries=globals.REST_MAX_RETRIES)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                RESTHashtableConnection.__session = session
+            return RESTHashtableConnection.__session
         
     def receive_hashtable(self, payload: Any=None) -> dict[str, dict]:
         Server.logger.info(f"Making request to {self.__url}")
-        response = requests.get(self.__url)
+        response = self.get_session().get(self.__url, timeout=self.__timeout)
         response.raise_for_status()
         response = response.json()
         return response
     
-    def send_hashtable_entry(self, entry: dict) -> None:
-        try:
-            Server.logger.info(f"Sending {entry} with REST-Connection to {self.__url}")
-            response = requests.post(self.__url, json=entry)
-            Server.logger.info(f"Server response: {response.json()}")
-            response.raise_for_status()
-        except Exception as e:
-            Server.logger.error(f"Unexpected error when sending request --resolution: {e}")
+    ## a 4xx answer is the service refusing the entry, any other error reaches the caller
+    ## so an undelivered push is not taken as acknowledged
+    def send_hashtable_entry(self, entry: dict) -> bool:
+        Server.logger.info(f"Sending {entry} with REST-Connection to {self.__url}")
+        response = self.get_session().post(self.__url, json=entry, timeout=self.__timeout)
+        if 400 <= response.status_code < 500:
+            Server.logger.warning(f"Server refused entry {entry.get('peer_id')} --status: {response.status_code}")
+            return False
+        response.raise_for_status()
+        Server.logger.info(f"Server response: {response.json()}")
+        return True
+    
+    def close(self) -> None:
+        pass
+
+## Peer to peer sync messages are newline terminated JSON documents, the reader is kept
+## for the whole conversation so bytes buffered past one message are not lost
+class SyncChannel():
+    def __init__(self, sock: socket.socket) -> None:
+        self.__sock     = sock
+        self.__reader   = sock.makefile('rb')
+    
+    def send(self, message: dict) -> None:
+        self.__sock.sendall(json.dumps(message).encode(globals.ENCODING) + b'\n')
+    
+    def receive(self) -> dict:
+        data = self.__reader.readline()
+        if not data.endswith(b'\n'):
+            raise ConnectionError("connection closed before the message was complete")
+        message = json.loads(data.decode(globals.ENCODING))
+        if not isinstance(message, dict):
+            raise TypeError(f"message must be an object, got {type(message).__name__}")
+        return message
+    
+    ## the fields below come from the other peer, anything off shape raises TypeError
+    @staticmethod
+    def prefixes(message: dict) -> list[str]:
+        prefixes = message.get("prefixes")
+        if not isinstance(prefixes, list) or not all(isinstance(prefix, str) and all(char in string.hexdigits for char in prefix) for prefix in prefixes):
+            raise TypeError("prefixes must be a list of hex strings")
+        return prefixes
+    
+    @staticmethod
+    def entries(message: dict) -> dict[str, dict]:
+        entries = message.get("entries")
+        if not isinstance(entries, dict) or not all(isinstance(entry, dict) for entry in entries.values()):
+            raise TypeError(f"entries must map keys to entries, got {type(entries).__name__}")
+        return entries
+    
+    def close(self) -> None:
+        self.__reader.close()
+
+## updatedAt is written by udht as 'YYYY-MM-DD HH:MM:SS.ffffff', entries without one lose
+## every conflict
+def parse_timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
 
 class Server():
+    ## Each round syncs with every peer from a bounded pool of workers. A peer gets its own
+    ## connection with connect/read timeouts and is retried with exponential backoff, so a
+    ## round takes about as long as the slowest peer. Tables are reconciled through the
+    ## merkle tree: roots are compared, only differing ranges are walked down and only the
+    ## entries of the differing leaves cross the wire
     class PeerSyncJob():
-        def __init__(self, address) -> None:
-            connection=TCPHashtableConnection(address)
-            self.__hashtable = connection.receive_hashtable()
+        def __init__(self, workers: int = globals.PEER_SYNC_WORKERS, retries: int = globals.PEER_SYNC_RETRIES) -> None:
+            self.__workers = workers
+            self.__retries = retries
         
         def __call__(self) -> Any:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            hashtable = self.__hashtable
-            for key in hashtable:
-                peer_ip = hashtable[key].get("ip", None)
-                peer_port = hashtable[key].get("port", None)
-                sock.connect((peer_ip, int(peer_port)))
-                sock.send(json.dumps(hashtable).encode(globals.ENCODING))
-                peer_hashtable = sock.recv(1024)
-                peer_hashtable = json.loads(peer_hashtable.decode(globals.ENCODING))
-                Server.merge_hashtables(peer_hashtable)
+            addresses = { address for address in map(Server.PeerSyncJob.get_peer_address, list(Server.hashtable.values())) if address }
+            if not addresses:
+                return
+            Server.logger.info(f"Starting peer sync round --peers: {len(addresses)}")
+            synced = 0
+            with ThreadPoolExecutor(max_workers=min(self.__workers, len(addresses))) as executor:
+                futures = { executor.submit(self.__sync_peer, address): address for address in addresses }
+                for future in as_completed(futures):
+                    try:
+                        peer_entries = future.result()
+                        if peer_entries is not None:
+                            if peer_entries:
+                                Server.merge_hashtables(peer_entries)
+                            synced += 1
+                    except Exception as e:
+                        Server.logger.error(f"Peer sync with {futures[future]} failed --resolution: {e}")
+            Server.logger.info(f"Finished peer sync round --synced: {synced}/{len(addresses)}")
+        
+        def __sync_peer(self, address: tuple[str, int]) -> dict[str, dict] | None:
+            for attempt in range(self.__retries):
+                try:
+                    with socket.create_connection(address, timeout=globals.PEER_SYNC_CONNECT_TIMEOUT) as sock:
+                        sock.settimeout(globals.PEER_SYNC_READ_TIMEOUT)
+                        channel = SyncChannel(sock)
+                        try:
+                            return Server.PeerSyncJob.reconcile(channel)
+                        finally:
+                            channel.close()
+                except OSError as e:
+                    Server.logger.warning(f"Peer sync with {address} failed --attempt: {attempt + 1} --resolution: {e}")
+                    if attempt + 1 < self.__retries:
+                        time.sleep(globals.PEER_SYNC_BACKOFF * (2 ** attempt) * (1 + random.random()))
+                ## a malformed reply, undecodable json included, would be the same on a retry
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    Server.logger.warning(f"Peer sync with {address} failed --resolution: malformed reply: {e!r}")
+                    return None
+            return None
+        
+        ## client side of the anti-entropy exchange, returns the peer's entries of the leaves
+        ## that differ, empty when both roots match
+        @staticmethod
+        def reconcile(channel: SyncChannel) -> dict[str, dict]:
+            tree = Server.merkle
+            channel.send({ "op": "root", "digest": tree.root() })
+            prefixes = [] if channel.receive()["digest"] == tree.root() else [""]
+            for _ in range(tree.get_depth()):
+                if not prefixes:
+                    break
+                channel.send({ "op": "children", "prefixes": prefixes })
+                remote = channel.receive()["digests"]
+                if not isinstance(remote, dict):
+                    raise TypeError(f"digests must be an object, got {type(remote).__name__}")
+                prefixes = [ prefix for prefix, digest in tree.children(prefixes).items() if remote.get(prefix) != digest ]
+            peer_entries = dict()
+            if prefixes:
+                hashtable = Server.hashtable
+                entries = { key: hashtable[key] for key in tree.keys(prefixes) if key in hashtable }
+                channel.send({ "op": "entries", "prefixes": prefixes, "entries": entries })
+                peer_entries = SyncChannel.entries(channel.receive())
+            channel.send({ "op": "done" })
+            return peer_entries
+        
+        @staticmethod
+        def get_peer_address(entry: dict) -> tuple[str, int] | None:
+            ip = entry.get("ip", None)
+            port = (entry.get("ports") or dict()).get("userSync", None) or entry.get("port", None)
+            if not ip or not port:
+                return None
+            return (ip, int(port))
                 
         
+    ## Pushes only the keys merge_hashtables marked dirty since the last successful push,
+    ## in batches of TABLE_SYNC_BATCH_SIZE. Keys that were not delivered are marked dirty
+    ## again for the next run, keys the service refused are logged and dropped until they
+    ## change again, an idle table costs nothing
     class TableSyncJob():
         def __init__(self, connection: HashTableConnection) -> None:
             self.__connection = connection
@@ -126,19 +338,36 @@ class Server():
         def get_connection(self) -> HashTableConnection:
             return self.__connection
             
-        def __call__(self, hashtable: dict[str, dict]) -> Any:
-            Server.logger.info("Starting table sync job --resolution: peer-loop")
+        def __call__(self) -> Any:
+            with Server.hashtable_lock:
+                dirty = Server.changes
+                Server.changes = set()
+                entries = { key: Server.hashtable[key] for key in dirty if key in Server.hashtable }
+            if not entries:
+                return
+            Server.logger.info(f"Starting table sync job --dirty: {len(entries)}")
             connection = self.get_connection()
-            Server.logger.info(hashtable)
-            for key in hashtable:
-                try:
-                    Server.logger.info(f"Hashtable key about to be send: --resolution: {key}")
-                    connection.send_hashtable_entry(hashtable.get(key))
-                except Exception as e:
-                    Server.logger.error(f"An error was raised when sending entry: --resolution: {e} --entry: {hashtable.get(key)}")
-            
-            if isinstance(connection, TCPHashtableConnection):
-                connection.close()
+            keys = list(entries)
+            pushed = 0
+            failed: list[str] = list()
+            rejected: list[str] = list()
+            try:
+                for start in range(0, len(keys), globals.TABLE_SYNC_BATCH_SIZE):
+                    batch = keys[start:start + globals.TABLE_SYNC_BATCH_SIZE]
+                    results = connection.send_hashtable_entries([ entries[key] for key in batch ])
+                    failed.extend(key for key, result in zip(batch, results) if result is None)
+                    rejected.extend(key for key, result in zip(batch, results) if result is False)
+                    pushed += len(batch)
+            except Exception as e:
+                Server.logger.error(f"An error was raised when sending entries: --resolution: {e} --pending: {len(keys) - pushed}")
+                failed.extend(keys[pushed:])
+            if rejected:
+                Server.logger.warning(f"Service refused {len(rejected)} entries, dropped until they change: {rejected[:10]}")
+            ## keys that never reached the service are pushed again on the next run
+            if failed:
+                with Server.hashtable_lock:
+                    Server.changes.update(failed)
+            Server.logger.info(f"Finished table sync job --acknowledged: {len(keys) - len(failed) - len(rejected)} --rejected: {len(rejected)} --failed: {len(failed)}")
 
     class ConnectionPool():
         class ConnectionThread(threading.Thread):
@@ -161,13 +390,40 @@ class Server():
             def run(self) -> None:
                 Server.logger.info(f"Starting client connection thread sync with: {self.get_adress()}")
                 conn = self.get_connection()
-                data = conn.recv(1024)
-                decoded_hashtable = json.loads(data.decode(globals.ENCODING))
-                encoded_hashtable = json.dumps(self.hashtable).encode(globals.ENCODING)
-                conn.sendall(encoded_hashtable)
-                Server.merge_hashtables(decoded_hashtable)
-                Server.logger.warning(f"Finished hashtable merge --hashtable not persisted await for the next job schedule")
-                return super().run()
+                channel = None
+                try:
+                    channel = SyncChannel(conn)
+                    conn.settimeout(globals.PEER_SYNC_READ_TIMEOUT)
+                    self.__serve(channel)
+                except Exception as e:
+                    Server.logger.error(f"Client connection sync with {self.get_adress()} failed --resolution: {e!r}")
+                finally:
+                    if channel:
+                        channel.close()
+                    conn.close()
+                    ## frees the pool slot whatever happened above
+                    super().run()
+            
+            ## server side of PeerSyncJob.reconcile, answers root and children digests and
+            ## swaps the entries of the differing leaves
+            def __serve(self, channel: SyncChannel) -> None:
+                tree = Server.merkle
+                while True:
+                    message = channel.receive()
+                    operation = message.get("op")
+                    if operation == "root":
+                        channel.send({ "digest": tree.root() })
+                    elif operation == "children":
+                        channel.send({ "digests": tree.children(SyncChannel.prefixes(message)) })
+                    elif operation == "entries":
+                        prefixes, entries = SyncChannel.prefixes(message), SyncChannel.entries(message)
+                        hashtable = Server.hashtable
+                        channel.send({ "entries": { key: hashtable[key] for key in tree.keys(prefixes) if key in hashtable } })
+                        if entries:
+                            Server.merge_hashtables(entries)
+                            Server.logger.warning(f"Finished hashtable merge --hashtable not persisted await for the next job schedule")
+                    else:
+                        return
             
         class ServerConnectionThread(ConnectionThread):
             def run(self) -> None:
@@ -203,7 +459,12 @@ class Server():
                 Server.logger.info('RequestUDHTThread started')
                 connection = self.get_connection()
                 hashtable = connection.receive_hashtable()
-                Server.hashtable = hashtable
+                updated_at = { key: parse_timestamp(entry.get('updatedAt')) for key, entry in hashtable.items() }
+                merkle = MerkleTree.from_hashtable(hashtable, globals.MERKLE_DEPTH)
+                with Server.hashtable_lock:
+                    Server.hashtable = hashtable
+                    Server.updated_at = updated_at
+                    Server.merkle = merkle
                 Server.logger.info('RequestUDHTThread finished --resolution: builded hashtable and closing state')
                 Server.logger.info(f'User Hash Table entries {len(Server.hashtable)}')
                 super().run()
@@ -215,8 +476,11 @@ class Server():
                 Server.logger.error(f"Unexpected error --resolution: {e}")
     
     hashtable: dict[str, dict]      = dict()
+    ## epoch of every entry's updatedAt, parsed once when the entry is taken in
+    updated_at: dict[str, float]    = dict()
+    hashtable_lock: threading.RLock = threading.RLock()
+    merkle: MerkleTree              = MerkleTree(globals.MERKLE_DEPTH)
     configuration: dict[str, dict]  = dict()
-    changes: dict[str, dict]        = dict()
     logger: logging.Logger          = logging.getLogger(__name__)
     thread_pool: ConnectionPool     = ConnectionPool()
     diff_count: int                 = 0
@@ -262,8 +526,8 @@ class Server():
     
     def __setup_jobs(self) -> None:
         connection = self.get_service_connection()
-        self.scheduler.add_job(self.TableSyncJob(connection=connection(self.get_connection_tuple())), 'interval', seconds=globals.SCHEDULER_TABLE_SYNC_JOB_HOUR_INTERVAL, args=[Server.hashtable])
-        self.scheduler.add_job(self.PeerSyncJob(address=(self.configuration['udht']['manager']['ip'], self.configuration['udht']['manager']['port'])), 'interval', seconds=globals.SCHEDULER_PEER_SYNC_JOB_HOUR_INTERVAL)
+        self.scheduler.add_job(self.TableSyncJob(connection=connection(self.get_connection_tuple())), 'interval', seconds=globals.SCHEDULER_TABLE_SYNC_JOB_HOUR_INTERVAL, max_instances=1)
+        self.scheduler.add_job(self.PeerSyncJob(), 'interval', seconds=globals.SCHEDULER_PEER_SYNC_JOB_HOUR_INTERVAL, max_instances=1)
         self.scheduler.start()
         Server.logger.info("Sheduler started --resolution: \n(+)\t awaiting for TableSyncJob\n(+)\t awaiting for PeerSyncJob")
     
@@ -281,31 +545,34 @@ class Server():
         connection_class: Type[HashTableConnection] = getattr(self, connection_atrr)
         return connection_class
             
+    ## last writer wins on the epoch of updatedAt in a single pass over the incoming
+    ## table, under the hashtable lock so jobs and client threads never merge at once
     @staticmethod
     def merge_hashtables(peer_hashtable: dict[str, dict]) -> None:
-        unique_keys   = set(peer_hashtable)-set(Server.hashtable)
-        conflict_keys = set(peer_hashtable.keys()) & set(Server.hashtable.keys())
-        Server.logger.info(f"Peer diff: {len(unique_keys)} entries")
-        Server.logger.info(f"Peer conflict: {len(conflict_keys)} entries")
-        for key in unique_keys:
-            Server.hashtable[key] = peer_hashtable[key]
-            Server.diff_count += 1
-            Server.logger.info(f"Added peer {key} to in-memory hashtable --diff: {Server.diff_count}")
-            
-        for key in conflict_keys:
-            Server.logger.info(f"Peer conflict: {key} --resolution: 002.1")
-            client_updated_at = peer_hashtable.get(key).get('updatedAt')
-            server_updated_at = Server.hashtable.get(key).get('updatedAt')
-            client_updated_at = datetime.datetime.strptime(client_updated_at, '%Y-%m-%d %H:%M:%S.%f')
-            server_updated_at = datetime.datetime.strptime(server_updated_at, '%Y-%m-%d %H:%M:%S.%f')
-            
-            if client_updated_at > server_updated_at: 
-                Server.diff_count += 1
-                Server.logger.info(f"Updated peer {key} to in-memory hashtable --diff: {Server.diff_count}")
-                Server.hashtable[key] = peer_hashtable[key]
+        added = updated = 0
+        with Server.hashtable_lock:
+            hashtable = Server.hashtable
+            updated_at = Server.updated_at
+            for key, entry in peer_hashtable.items():
+                local = hashtable.get(key, None)
+                ## the common case between synced peers, nothing to parse
+                if local is not None and local.get('updatedAt') == entry.get('updatedAt'):
+                    continue
+                timestamp = parse_timestamp(entry.get('updatedAt'))
+                current = updated_at.get(key, None)
+                if current is None:
+                    added += 1
+                elif timestamp > current:
+                    updated += 1
+                else:
+                    continue
+                hashtable[key] = entry
+                updated_at[key] = timestamp
+                Server.merkle.update(key, entry)
                 Server.changes.add(key)
-        
-        Server.logger.info(f"Finished hashtable merge in-memory-hashtable: {len(Server.hashtable)} entries")
+            Server.diff_count += added + updated
+            size = len(hashtable)
+        Server.logger.info(f"Finished hashtable merge --received: {len(peer_hashtable)} --added: {added} --updated: {updated} --entries: {size}")
                 
                          
 
@@ -0,0 +1,84 @@
+from hashlib import blake2b
+from typing import Iterable
+import threading
+import json
+
+## Hash-range tree over the hashtable used for anti-entropy between peers. Keys fall in
+## one of 16**depth leaf ranges by the hex prefix of their hash, every node is the xor of
+## the entry hashes below it so a change is applied in O(depth) without rehashing the
+## table. Peers compare the root, walk down only the children that differ and exchange
+## the entries of the differing leaves
+class MerkleTree():
+    FANOUT = 16
+
+    def __init__(self, depth: int = 4) -> None:
+        self.__depth    = depth
+        self.__levels   = [ [0] * (self.FANOUT ** level) for level in range(depth + 1) ]
+        self.__hashes: dict[str, int] = dict()
+        self.__buckets: dict[int, set[str]] = dict()
+        self.__lock     = threading.Lock()
+
+    @staticmethod
+    def from_hashtable(hashtable: dict[str, dict], depth: int = 4) -> "MerkleTree":
+        tree = MerkleTree(depth)
+        for key, entry in hashtable.items():
+            tree.update(key, entry)
+        return tree
+
+    def get_depth(self) -> int:
+        return self.__depth
+
+    def __leaf(self, key: str) -> int:
+        return int(blake2b(key.encode(), digest_size=8).hexdigest()[:self.__depth], 16)
+
+    def __apply(self, leaf: int, delta: int) -> None:
+        for level in range(self.__depth, -1, -1):
+            self.__levels[level][leaf] ^= delta
+            leaf //= self.FANOUT
+
+    def update(self, key: str, entry: dict) -> None:
+        digest = int.from_bytes(blake2b((key + json.dumps(entry, sort_keys=True)).encode(), digest_size=8).digest(), "big")
+        leaf = self.__leaf(key)
+        with self.__lock:
+            previous = self.__hashes.get(key, 0)
+            if previous == digest:
+                return
+            self.__hashes[key] = digest
+            self.__buckets.setdefault(leaf, set()).add(key)
+            self.__apply(leaf, previous ^ digest)
+
+    def remove(self, key: str) -> None:
+        leaf = self.__leaf(key)
+        with self.__lock:
+            previous = self.__hashes.pop(key, None)
+            if previous is None:
+                return
+            bucket = self.__buckets[leaf]
+            bucket.discard(key)
+            if not bucket:
+                del self.__buckets[leaf]
+            self.__apply(leaf, previous)
+
+    def root(self) -> str:
+        return self.__format(self.__levels[0][0])
+
+    ## digests of every child of the given prefixes, keyed by the child prefix
+    def children(self, prefixes: Iterable[str]) -> dict[str, str]:
+        digests = dict()
+        with self.__lock:
+            for prefix in prefixes:
+                level = len(prefix) + 1
+                if level > self.__depth:
+                    continue
+                base = int(prefix, 16) * self.FANOUT if prefix else 0
+                for child in range(self.FANOUT):
+                    digests[prefix + format(child, "x")] = self.__format(self.__levels[level][base + child])
+        return digests
+
+    def keys(self, leaves: Iterable[str]) -> list[str]:
+        with self.__lock:
+            return [ key for leaf in leaves if len(leaf) == self.__depth for key in self.__buckets.get(int(leaf, 16), ()) ]
+
+    @staticmethod
+    def __format(value: int) -> str:
+        return format(value, "016x")
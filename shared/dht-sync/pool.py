@@ -0,0 +1,115 @@
+from collections import deque
+from typing import BinaryIO
+import threading
+import socket
+import time
+
+class PooledSocket():
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock: socket.socket    = sock
+        self.reader: BinaryIO       = sock.makefile('rb')
+        self.last_used: float       = time.monotonic()
+        self.reused: bool           = False
+
+    ## an idle keep-alive socket has nothing to read, EOF or stray bytes mean the other
+    ## side closed it or the stream is out of step
+    def is_healthy(self) -> bool:
+        timeout = self.sock.gettimeout()
+        try:
+            self.sock.setblocking(False)
+            self.sock.recv(1, socket.MSG_PEEK)
+            return False
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        finally:
+            self.sock.settimeout(timeout)
+
+    def close(self, farewell: bytes | None = None) -> None:
+        try:
+            if farewell:
+                self.sock.sendall(farewell)
+        except OSError:
+            pass
+        finally:
+            self.reader.close()
+            self.sock.close()
+
+## Bounded pool of keep-alive sockets to one address, shared by every connection object
+## pointing at it. Idle sockets are health checked before they are handed out again and
+## dropped once idle for longer than idle_timeout, acquire blocks while max_size sockets
+## are in use
+class SocketPool():
+    __pools: dict[tuple[str, int], "SocketPool"] = dict()
+    __pools_lock = threading.Lock()
+
+    def __init__(self, address: tuple[str, int], max_size: int, connect_timeout: float, read_timeout: float, idle_timeout: float) -> None:
+        self.__address          = address
+        self.__max_size         = max_size
+        self.__connect_timeout  = connect_timeout
+        self.__read_timeout     = read_timeout
+        self.__idle_timeout     = idle_timeout
+        self.__idle: deque[PooledSocket] = deque()
+        self.__size             = 0
+        self.__condition        = threading.Condition()
+
+    @staticmethod
+    def get(address: tuple[str, int], max_size: int, connect_timeout: float, read_timeout: float, idle_timeout: float) -> "SocketPool":
+        with SocketPool.__pools_lock:
+            pool = SocketPool.__pools.get(address, None)
+            if pool is None:
+                pool = SocketPool(address, max_size, connect_timeout, read_timeout, idle_timeout)
+                SocketPool.__pools[address] = pool
+            return pool
+
+    def get_address(self) -> tuple[str, int]:
+        return self.__address
+
+    def acquire(self) -> PooledSocket:
+        deadline = time.monotonic() + self.__connect_timeout
+        with self.__condition:
+            while True:
+                while self.__idle:
+                    connection = self.__idle.pop()
+                    if time.monotonic() - connection.last_used < self.__idle_timeout and connection.is_healthy():
+                        connection.reused = True
+                        return connection
+                    connection.close()
+                    self.__size -= 1
+                if self.__size < self.__max_size:
+                    self.__size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.__condition.wait(remaining):
+                    raise TimeoutError(f"no connection to {self.__address} available in the pool")
+        try:
+            sock = socket.create_connection(self.__address, timeout=self.__connect_timeout)
+            sock.settimeout(self.__read_timeout)
+            return PooledSocket(sock)
+        except BaseException:
+            with self.__condition:
+                self.__size -= 1
+                self.__condition.notify()
+            raise
+
+    def release(self, connection: PooledSocket) -> None:
+        connection.last_used = time.monotonic()
+        with self.__condition:
+            self.__idle.append(connection)
+            self.__condition.notify()
+
+    def discard(self, connection: PooledSocket, farewell: bytes | None = None) -> None:
+        connection.close(farewell)
+        with self.__condition:
+            self.__size -= 1
+            self.__condition.notify()
+
+    def close(self, farewell: bytes | None = None) -> None:
+        with self.__condition:
+            idle = list(self.__idle)
+            self.__idle.clear()
+            self.__size -= len(idle)
+            self.__condition.notify_all()
+        for connection in idle:
+            connection.close(farewell)
@@ -8,4 +8,4 @@ class DHTModule(Module):
     
     @provider
     def provide_dht_service(self) -> DHTService:
-        return DHTService(globals.D_HASH_TABLE_NAME)
\ No newline at end of file
+        return DHTService(globals.D_HASH_TABLE_NAME, globals.D_HASH_TABLE_STORAGE, globals.CHANGE_LOG_SIZE, globals.PEER_CACHE_SIZE, globals.PEER_CACHE_TTL)
\ No newline at end of file
@@ -1,50 +1,230 @@
 from core.Peer import Peer
+from core.ReadWriteLock import ReadWriteLock
+from core.LogStorage import LogStorage
+from core.PeerCache import PeerCache
 from injector import inject
 from singleton_decorator import singleton
-from datetime import datetime
+import time
+from typing import Iterator
+from collections import deque
+from contextlib import nullcontext
+import uuid
 import shelve
-import pickle
+import bisect
 
+## The shelve file is opened once and mirrored in memory as Peer objects, reads are served
+## from the index and every mutation is written through to the file under the write lock.
+## Storage keeps the serialized dicts so existing tables load unchanged
 @singleton
 class DHTService:
     @inject
-    def __init__(self, filename: str) -> None:
+    def __init__(self, filename: str, storage: str = "shelve", change_log_size: int = 10000, cache_size: int = 10000, cache_ttl: float = 30.0) -> None:
         self.__filename = filename
-        
-    def create_peer(self, peer: Peer) -> bool:     
-        with shelve.open(self.__filename) as hash_table:
-            registry = hash_table.get(peer.ip, None)
-            if not registry:
-                hash_table[peer.peer_id] = peer.serialize()
-                print(hash_table[peer.peer_id])
-                print(peer.peer_id)
-                return True
-        return False
-    
+        self.__lock     = ReadWriteLock()
+        self.__storage  = LogStorage(self.__filename) if storage == "log" else shelve.open(self.__filename)
+        self.__batch    = self.__storage.batch if storage == "log" else nullcontext
+        self.__peers: dict[str, Peer] = { peer_id: Peer.from_dict(registry) for peer_id, registry in self.__storage.items() }
+        ## secondary indexes, kept in step with __peers by __write and __delete
+        self.__by_ip: dict[str, set[str]]   = dict()
+        self.__by_name: dict[str, set[str]] = dict()
+        for peer_id, peer in self.__peers.items():
+            self.__index(peer_id, peer)
+        ## every mutation bumps the version and is kept in a bounded change log, the epoch
+        ## changes on every start so versions handed out by a previous run are not trusted
+        self.__epoch    = uuid.uuid4().hex
+        self.__version  = 0
+        self.__changes: deque[tuple[int, str, Peer | None]] = deque(maxlen=change_log_size)
+        self.__cache    = PeerCache(cache_size, cache_ttl)
+        ## (peer_id, previous peer) of every write of the running batch, to roll it back
+        self.__journal: list[tuple[str, Peer | None]] | None = None
+
+    def create_peer(self, peer: Peer) -> bool:
+        with self.__lock.write():
+            return self.__create(peer)
+
     def update_peer(self, peer: Peer) -> bool:
-        with shelve.open(self.__filename) as hash_table:
-            registry = hash_table.get(peer.ip, None)
-            if registry:
-                peer.updated_at = datetime.now()
-                hash_table[peer.peer_id] = peer.serialize()
-                return True
-        return False
-    
+        with self.__lock.write():
+            return self.__update(peer)
+
     def remove_peer(self, peer: Peer) -> bool:
-        with shelve.open(self.__filename) as hash_table:
-            registry = hash_table.get(peer.ip, None)
-            if registry:
-                hash_table[peer.peer_id] = None
-                del hash_table[peer.peer_id]
-                return True
-        return False
-    
+        with self.__lock.write():
+            return self.__remove(peer)
+
+    ## applies (operation, peer) pairs under a single write lock and storage batch,
+    ## returning one result per operation in order. When an operation raises, the ones
+    ## before it are rolled back in memory and the error is raised. The log backend drops
+    ## the whole batch from disk, a crash included. Shelve only gets compensating writes
+    def apply_batch(self, operations: list[tuple[str, Peer]]) -> list[bool]:
+        results = list()
+        with self.__lock.write():
+            self.__journal = list()
+            try:
+                with self.__batch():
+                    for operation, peer in operations:
+                        apply = self.__operations.get(operation, None)
+                        results.append(apply(self, peer) if apply else False)
+            except BaseException:
+                journal, self.__journal = self.__journal, None
+                self.__rollback(journal)
+                raise
+            self.__journal = None
+        return results
+
+    ## hits skip the lock entirely, misses fill the cache while still holding the read lock
+    ## so a concurrent mutation can not be overwritten by the value read before it
     def get_peer(self, peer_id: str) -> dict | None:
-        with shelve.open(self.__filename) as hash_table:
-            return hash_table.get(peer_id, None)
-    
-    def get_hash_table(self) -> dict:
-        hash_table_copy = dict()
-        with shelve.open(self.__filename) as hash_table:  
-            hash_table_copy = pickle.dumps(dict(hash_table))
-        return hash_table_copy
\ No newline at end of file
+        registry = self.__cache.get(peer_id)
+        if registry is not None:
+            return registry
+        with self.__lock.read():
+            peer = self.__peers.get(peer_id, None)
+            if peer is None:
+                return None
+            registry = peer.serialize()
+            self.__cache.put(peer_id, registry)
+            return registry
+
+    def get_stats(self) -> dict:
+        with self.__lock.read():
+            return { "peers": len(self.__peers), "epoch": self.__epoch, "version": self.__version, "cache": self.__cache.stats() }
+
+    def get_peers_by_ip(self, ip: str) -> list[dict]:
+        with self.__lock.read():
+            return [ self.__peers[peer_id].serialize() for peer_id in self.__by_ip.get(ip, ()) ]
+
+    def get_peers_by_name(self, name: str) -> list[dict]:
+        with self.__lock.read():
+            return [ self.__peers[peer_id].serialize() for peer_id in self.__by_name.get(name, ()) ]
+
+    ## yields the table in pages of page_size peers in key order together with the cursor of
+    ## the next page, the last key sent, None on the last one. Resuming after a key instead
+    ## of an offset means peers removed between requests can not shift the next page. Each
+    ## page is read from the index when it is requested and peers removed meanwhile are skipped
+    def iter_hash_table(self, page_size: int, cursor: str | None = None) -> Iterator[tuple[dict[str, dict], str | None]]:
+        if page_size < 1 or not isinstance(cursor, (str, type(None))):
+            raise ValueError(f"invalid page_size {page_size} or cursor {cursor!r}")
+        with self.__lock.read():
+            peer_ids = sorted(self.__peers)
+        start = 0 if cursor is None else bisect.bisect_right(peer_ids, cursor)
+        while True:
+            page = peer_ids[start:start + page_size]
+            start += len(page)
+            with self.__lock.read():
+                peers = { peer_id: self.__peers[peer_id].serialize() for peer_id in page if peer_id in self.__peers }
+            if start >= len(peer_ids):
+                yield peers, None
+                return
+            yield peers, page[-1]
+
+    def get_version(self) -> tuple[str, int]:
+        with self.__lock.read():
+            return self.__epoch, self.__version
+
+    ## peers added or updated and ids removed after version, collapsed to the latest state of
+    ## each peer. When the epoch differs or the log no longer reaches back to version only
+    ## resync is set, the client reloads the table through the paged SEND_HASH_TABLE stream
+    def get_changes(self, epoch: str, version: int) -> dict:
+        with self.__lock.read():
+            changes = { "epoch": self.__epoch, "version": self.__version, "resync": False, "peers": dict(), "removed": list() }
+            if version == self.__version and epoch == self.__epoch:
+                return changes
+            if epoch != self.__epoch or version > self.__version or not self.__changes or self.__changes[0][0] > version + 1:
+                changes["resync"] = True
+                return changes
+            latest: dict[str, Peer | None] = dict()
+            for change_version, peer_id, peer in reversed(self.__changes):
+                if change_version <= version:
+                    break
+                latest.setdefault(peer_id, peer)
+            for peer_id, peer in latest.items():
+                if peer is None:
+                    changes["removed"].append(peer_id)
+                else:
+                    changes["peers"][peer_id] = peer.serialize()
+            return changes
+
+    def close(self) -> None:
+        with self.__lock.write():
+            self.__storage.close()
+
+    def __create(self, peer: Peer) -> bool:
+        if peer.peer_id and peer.peer_id not in self.__peers:
+            self.__write(peer.peer_id, peer)
+            return True
+        return False
+
+    def __update(self, peer: Peer) -> bool:
+        peer_id = self.__resolve(peer)
+        if peer_id:
+            peer.peer_id = peer_id
+            peer.created_at = self.__peers[peer_id].created_at
+            peer.updated_at = time.time()
+            self.__write(peer_id, peer)
+            return True
+        return False
+
+    def __remove(self, peer: Peer) -> bool:
+        peer_id = self.__resolve(peer)
+        if peer_id:
+            self.__delete(peer_id)
+            return True
+        return False
+
+    __operations = { "add": __create, "update": __update, "remove": __remove }
+
+    ## a peer is addressed by its id, requests that only carry an ip resolve to the
+    ## peer registered on it as long as that ip is not shared
+    def __resolve(self, peer: Peer) -> str | None:
+        if peer.peer_id in self.__peers:
+            return peer.peer_id
+        if not peer.peer_id:
+            peer_ids = self.__by_ip.get(peer.ip, ())
+            if len(peer_ids) == 1:
+                return next(iter(peer_ids))
+        return None
+
+    def __write(self, peer_id: str, peer: Peer) -> None:
+        previous = self.__peers.get(peer_id, None)
+        if self.__journal is not None:
+            self.__journal.append((peer_id, previous))
+        self.__storage[peer_id] = peer.serialize()
+        if previous:
+            self.__unindex(peer_id, previous)
+        self.__peers[peer_id] = peer
+        self.__index(peer_id, peer)
+        self.__record(peer_id, peer)
+
+    def __delete(self, peer_id: str) -> None:
+        if self.__journal is not None:
+            self.__journal.append((peer_id, self.__peers.get(peer_id, None)))
+        self.__storage.pop(peer_id, None)
+        peer = self.__peers.pop(peer_id, None)
+        if peer:
+            self.__unindex(peer_id, peer)
+            self.__record(peer_id, None)
+
+    ## restores the peers a failed batch touched, newest write first. The restores are
+    ## recorded as changes of their own so delta sync clients see the final state
+    def __rollback(self, journal: list[tuple[str, Peer | None]]) -> None:
+        for peer_id, previous in reversed(journal):
+            if previous is None:
+                self.__delete(peer_id)
+            else:
+                self.__write(peer_id, previous)
+
+    def __record(self, peer_id: str, peer: Peer | None) -> None:
+        self.__cache.invalidate(peer_id)
+        self.__version += 1
+        self.__changes.append((self.__version, peer_id, peer))
+
+    def __index(self, peer_id: str, peer: Peer) -> None:
+        self.__by_ip.setdefault(peer.ip, set()).add(peer_id)
+        self.__by_name.setdefault(peer.name, set()).add(peer_id)
+
+    def __unindex(self, peer_id: str, peer: Peer) -> None:
+        for index, key in ((self.__by_ip, peer.ip), (self.__by_name, peer.name)):
+            peer_ids = index.get(key, None)
+            if peer_ids is not None:
+                peer_ids.discard(peer_id)
+                if not peer_ids:
+                    del index[key]
@@ -0,0 +1,237 @@
+import os
+import pickle
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+## Append-only record log used as an alternative to shelve. Every put or delete is one
+## sequential write at the end of the file, an offset index in memory points each key at
+## its latest record. Records carry a crc so a torn tail left by a crash is detected and
+## cut off on open. Once dead records outweigh live ones the log is rewritten with only
+## the live set and swapped in atomically, that rewritten file is the snapshot the next
+## start replays from. A batch is framed by BEGIN and COMMIT records, replay only applies
+## its records once the COMMIT is read so a crash never leaves part of a batch behind
+class LogStorage():
+    HEADER      = struct.Struct(">II")
+    PUT         = b"\x01"
+    DELETE      = b"\x02"
+    BEGIN       = b"\x03"
+    COMMIT      = b"\x04"
+
+    def __init__(self, filename: str, compact_ratio: float = 0.5, compact_min_size: int = 1 << 20, sync: bool = False) -> None:
+        self.__filename         = filename + ".log"
+        self.__compact_ratio    = compact_ratio
+        self.__compact_min_size = compact_min_size
+        self.__sync             = sync
+        self.__lock             = threading.Lock()
+        self.__index: dict[str, tuple[int, int]] = dict()
+        self.__live_size        = 0
+        self.__batching         = False
+        self.__pending          = False
+        ## index changes of the open batch, key to position or None when deleted
+        self.__staged: dict[str, tuple[int, int] | None] = dict()
+        self.__batch_start      = 0
+        self.__file             = open(self.__filename, "a+b")
+        self.__replay()
+
+    def __replay(self) -> None:
+        self.__file.seek(0)
+        offset = 0
+        valid = 0
+        staged: list[tuple[str, tuple[int, int] | None]] | None = None
+        while True:
+            header = self.__file.read(self.HEADER.size)
+            if len(header) < self.HEADER.size:
+                break
+            size, crc = self.HEADER.unpack(header)
+            record = self.__file.read(size)
+            if len(record) < size or zlib.crc32(record) != crc:
+                break
+            operation = record[:1]
+            if operation == self.BEGIN:
+                staged = list()
+            elif operation == self.COMMIT:
+                self.__apply(staged or list())
+                staged = None
+            else:
+                key = pickle.loads(record[1:])[0]
+                change = (key, (offset, self.HEADER.size + size) if operation == self.PUT else None)
+                if staged is None:
+                    self.__apply([ change ])
+                else:
+                    staged.append(change)
+            offset += self.HEADER.size + size
+            if staged is None:
+                valid = offset
+        ## anything after the last valid record or committed batch is a partial write
+        self.__file.truncate(valid)
+        self.__file.seek(0, os.SEEK_END)
+
+    def __apply(self, changes: list[tuple[str, tuple[int, int] | None]]) -> None:
+        for key, position in changes:
+            self.__drop(key)
+            if position is not None:
+                self.__index[key] = position
+                self.__live_size += position[1]
+
+    def __drop(self, key: str) -> None:
+        previous = self.__index.pop(key, None)
+        if previous:
+            self.__live_size -= previous[1]
+
+    def __append(self, operation: bytes, key: str | None = None, value: Any = None) -> tuple[int, int]:
+        record = operation if operation in (self.BEGIN, self.COMMIT) else operation + pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self.__file.tell()
+        self.__file.write(self.HEADER.pack(len(record), zlib.crc32(record)) + record)
+        if self.__batching:
+            self.__pending = True
+        else:
+            self.__flush()
+        return offset, self.HEADER.size + len(record)
+
+    def __flush(self) -> None:
+        self.__file.flush()
+        if self.__sync:
+            os.fsync(self.__file.fileno())
+        self.__pending = False
+
+    ## everything written inside the block is committed together when it exits, or cut
+    ## off the log when it raises. Reads inside the block see its own writes
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self.__lock:
+            self.__batch_start = self.__file.tell()
+            self.__batching = True
+            self.__staged = dict()
+            self.__append(self.BEGIN)
+        try:
+            yield
+        except BaseException:
+            with self.__lock:
+                self.__batching = False
+                self.__staged = dict()
+                self.__file.flush()
+                self.__file.truncate(self.__batch_start)
+                self.__file.seek(0, os.SEEK_END)
+                self.__pending = False
+            raise
+        with self.__lock:
+            self.__append(self.COMMIT)
+            self.__batching = False
+            self.__flush()
+            staged, self.__staged = self.__staged, dict()
+            self.__apply(list(staged.items()))
+            self.__maybe_compact()
+
+    def __change(self, key: str, position: tuple[int, int] | None) -> None:
+        if self.__batching:
+            self.__staged[key] = position
+            return
+        self.__apply([ (key, position) ])
+        self.__maybe_compact()
+
+    def __position(self, key: str) -> tuple[int, int] | None:
+        if self.__batching and key in self.__staged:
+            return self.__staged[key]
+        return self.__index.get(key, None)
+
+    def __read(self, position: tuple[int, int]) -> Any:
+        if self.__pending:
+            self.__file.flush()
+        offset, size = position
+        data = os.pread(self.__file.fileno(), size, offset)
+        return pickle.loads(data[self.HEADER.size + 1:])[1]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self.__lock:
+            self.__change(key, self.__append(self.PUT, key, value))
+
+    def __getitem__(self, key: str) -> Any:
+        with self.__lock:
+            position = self.__position(key)
+            if position is None:
+                raise KeyError(key)
+            return self.__read(position)
+
+    def __delitem__(self, key: str) -> None:
+        with self.__lock:
+            if self.__position(key) is None:
+                raise KeyError(key)
+            self.__append(self.DELETE, key, None)
+            self.__change(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        with self.__lock:
+            return self.__position(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.__index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.__index))
+
+    def keys(self) -> Iterator[str]:
+        return iter(self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self.__lock:
+            position = self.__position(key)
+            if position is None:
+                return default
+            value = self.__read(position)
+            self.__append(self.DELETE, key, None)
+            self.__change(key, None)
+            return value
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        with self.__lock:
+            positions = list(self.__index.items())
+            return iter([ (key, self.__read(position)) for key, position in positions ])
+
+    def __maybe_compact(self) -> None:
+        size = self.__file.tell()
+        if size >= self.__compact_min_size and size - self.__live_size > size * self.__compact_ratio:
+            self.__compact()
+
+    def compact(self) -> None:
+        with self.__lock:
+            self.__compact()
+
+    def __compact(self) -> None:
+        self.__file.flush()
+        temporary = self.__filename + ".compact"
+        index: dict[str, tuple[int, int]] = dict()
+        with open(temporary, "wb") as file:
+            offset = 0
+            for key, (position, size) in sorted(self.__index.items(), key=lambda item: item[1][0]):
+                file.write(os.pread(self.__file.fileno(), size, position))
+                index[key] = (offset, size)
+                offset += size
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.__filename)
+        self.__file.close()
+        self.__file = open(self.__filename, "a+b")
+        self.__file.seek(0, os.SEEK_END)
+        self.__index = index
+        self.__live_size = offset
+
+    def sync(self) -> None:
+        with self.__lock:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+
+    def close(self) -> None:
+        with self.__lock:
+            if not self.__file.closed:
+                self.__file.flush()
+                os.fsync(self.__file.fileno())
+                self.__file.close()
@@ -0,0 +1,41 @@
+import json
+import socket
+import globals
+
+## Newline delimited JSON over a stream socket, the udht server frames every request
+## with it. The buffer is kept between reads so a message split across recv calls, or
+## several messages in one, are framed correctly. A line longer than max_size without a
+## delimiter raises ValueError instead of growing the buffer. blockchain/core/stream.py
+## holds its own copy since each service runs from its own directory with its own globals
+## and no package is shared between them
+class MessageStream():
+    def __init__(self, connection: socket.socket, delimiter: bytes = b"\n", buffer_size: int = 4096, max_size: int = globals.MESSAGE_MAX_SIZE) -> None:
+        self.__connection   = connection
+        self.__max_size     = max_size
+        self.__delimiter    = delimiter
+        self.__buffer_size  = buffer_size
+        self.__buffer       = bytearray()
+        self.__scanned      = 0
+
+    def read(self) -> list[dict] | None:
+        chunk = self.__connection.recv(self.__buffer_size)
+        if not chunk:
+            return None
+        self.__buffer += chunk
+        messages = list()
+        start = 0
+        with memoryview(self.__buffer) as view:
+            index = self.__buffer.find(self.__delimiter, self.__scanned)
+            while index != -1:
+                if index - start > 0:
+                    data = str(view[start:index], globals.BASIC_DECODER)
+                    if not data.isspace():
+                        messages.append(json.loads(data))
+                start = index + len(self.__delimiter)
+                index = self.__buffer.find(self.__delimiter, start)
+        if start:
+            del self.__buffer[:start]
+        if len(self.__buffer) > self.__max_size:
+            raise ValueError(f"message exceeds {self.__max_size} bytes without a delimiter")
+        self.__scanned = max(0, len(self.__buffer) - len(self.__delimiter) + 1)
+        return messages
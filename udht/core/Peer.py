@@ -2,33 +2,68 @@ from __future__ import annotations
 from datetime import datetime
 from io import TextIOWrapper
 import json
+import time
 from socket import socket
 from typing import Dict, Union
 
+## Timestamps are kept as epoch floats and only formatted when the peer is serialized,
+## __slots__ keeps a peer at a fraction of the size of the dict it serializes to
 class Peer:
+    __slots__ = ("peer_id", "name", "ip", "ports", "created_at", "updated_at", "last_connection_on")
 
     ptuple = tuple[int, dict, tuple, socket]
-    def __init__(self, name: str, ip: str, ports: dict, peer_id: str) -> None:
+    def __init__(self, name: str, ip: str, ports: dict, peer_id: str, created_at: float | None = None, updated_at: float | None = None, last_connection_on: float | None = None) -> None:
+        now = time.time()
         self.peer_id = peer_id
         self.name = name
         self.ip = ip
         self.ports = ports
-        self.created_at = str(datetime.now())
-        self.updated_at = str(datetime.now())
-        self.last_connection_on = str(datetime.now())
-        
+        self.created_at = now if created_at is None else created_at
+        self.updated_at = now if updated_at is None else updated_at
+        self.last_connection_on = now if last_connection_on is None else last_connection_on
+
     def serialize(self) -> Dict[str, Union[str, str]]:
         return {
             "peer_id": self.peer_id,
             "name": self.name,
             "ip": self.ip,
             "ports": self.ports,
-            "createdAt": self.created_at,
-            "updatedAt": self.updated_at,
-            "lastConnectionOn": self.last_connection_on
+            "createdAt": Peer.format_timestamp(self.created_at),
+            "updatedAt": Peer.format_timestamp(self.updated_at),
+            "lastConnectionOn": Peer.format_timestamp(self.last_connection_on)
         }
-        
-    
+
+    ## rebuilds a peer from serialize() output without stamping new timestamps
+    @staticmethod
+    def from_dict(data: dict) -> Peer:
+        return Peer(
+            peer_id             = data.get("peer_id", ""),
+            name                = data.get("name", ""),
+            ip                  = data.get("ip", ""),
+            ports               = data.get("ports", ""),
+            created_at          = Peer.parse_timestamp(data.get("createdAt")),
+            updated_at          = Peer.parse_timestamp(data.get("updatedAt")),
+            last_connection_on  = Peer.parse_timestamp(data.get("lastConnectionOn"))
+        )
+
+    @staticmethod
+    def format_timestamp(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="microseconds")
+
+    ## tables written before timestamps were epoch floats hold datetime objects or strings,
+    ## a value that can not be read returns None so the field is stamped anew instead of
+    ## failing the load of the whole table
+    @staticmethod
+    def parse_timestamp(value: str | float | datetime | None) -> float | None:
+        if value is None or isinstance(value, (int, float)):
+            return value
+        if isinstance(value, datetime):
+            return value.timestamp()
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except (TypeError, ValueError):
+            return None
+
     @staticmethod
     def load_identity(file: TextIOWrapper) -> Peer:
         data = file.read()
@@ -39,5 +74,5 @@ class Peer:
             ip          = json_obj["ip"],
             ports       = json_obj["ports"]
         )
-        
-        
+
+
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+## Size bounded LRU with a time to live for GET_PEER results. Entries are dropped when
+## DHTService mutates the peer, the ttl only bounds how long an entry can outlive a
+## change made behind the service's back
+class PeerCache():
+    def __init__(self, max_size: int = 10000, ttl: float = 30.0) -> None:
+        self.__max_size     = max_size
+        self.__ttl          = ttl
+        self.__entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.__lock         = threading.Lock()
+        self.__hits         = 0
+        self.__misses       = 0
+        self.__evictions    = 0
+        self.__expirations  = 0
+
+    def get(self, peer_id: str) -> dict | None:
+        with self.__lock:
+            entry = self.__entries.get(peer_id, None)
+            if entry is None:
+                self.__misses += 1
+                return None
+            expires_at, registry = entry
+            if expires_at < time.monotonic():
+                del self.__entries[peer_id]
+                self.__expirations += 1
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(peer_id)
+            self.__hits += 1
+            return registry
+
+    def put(self, peer_id: str, registry: dict) -> None:
+        with self.__lock:
+            self.__entries[peer_id] = (time.monotonic() + self.__ttl, registry)
+            self.__entries.move_to_end(peer_id)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, peer_id: str) -> None:
+        with self.__lock:
+            self.__entries.pop(peer_id, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return {
+                "size": len(self.__entries),
+                "maxSize": self.__max_size,
+                "ttl": self.__ttl,
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "evictions": self.__evictions,
+                "expirations": self.__expirations,
+                "hitRatio": self.__hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,53 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+## Many readers or a single writer. Writers waiting for the lock block new readers so a
+## steady stream of GET_PEER requests can not starve an update
+class ReadWriteLock():
+    def __init__(self) -> None:
+        self.__condition        = threading.Condition(threading.Lock())
+        self.__readers          = 0
+        self.__writer           = False
+        self.__waiting_writers  = 0
+
+    def acquire_read(self) -> None:
+        with self.__condition:
+            while self.__writer or self.__waiting_writers:
+                self.__condition.wait()
+            self.__readers += 1
+
+    def release_read(self) -> None:
+        with self.__condition:
+            self.__readers -= 1
+            if self.__readers == 0:
+                self.__condition.notify_all()
+
+    def acquire_write(self) -> None:
+        with self.__condition:
+            self.__waiting_writers += 1
+            while self.__writer or self.__readers:
+                self.__condition.wait()
+            self.__waiting_writers -= 1
+            self.__writer = True
+
+    def release_write(self) -> None:
+        with self.__condition:
+            self.__writer = False
+            self.__condition.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -4,6 +4,7 @@ from core.DHTModule import DHTModule
 
 # Global Constants
 D_HASH_TABLE_NAME = "data/duser-hash-table"
+D_HASH_TABLE_STORAGE = os.getenv("DHT_STORAGE", "shelve")  # "shelve" or "log" (append-only)
 
 # Dependency Injection
 injector = Injector([DHTModule()])
@@ -14,10 +15,22 @@ CONSUMERS_QUANTITY = 4
 HOST = "127.0.0.1"
 PORT = int(os.getenv("DHT_PORT", 3002))  # Ensure PORT is an integer
 
+# Peers per frame when streaming the hash table (SEND_HASH_TABLE)
+HASH_TABLE_PAGE_SIZE = 500
+HASH_TABLE_MAX_PAGE_SIZE = 5000
+
+# Mutations kept for GET_CHANGES before clients are told to resync through SEND_HASH_TABLE
+CHANGE_LOG_SIZE = 10000
+
+# GET_PEER cache, entries are also dropped on every change to the peer
+PEER_CACHE_SIZE = 10000
+PEER_CACHE_TTL = 30.0  # seconds
+
 # Encoding Settings
 BASIC_DECODER = 'utf-8'
+MESSAGE_MAX_SIZE = 1024 * 1024  # longest request line accepted before the connection is dropped
 
 # Socket Settings
-SOCKETS_CONNECTION_LIMIT = 10
+SOCKETS_CONNECTION_LIMIT = 1024  # listen backlog, connections are served by one selector loop
 
 IDENTITY_FILE = "data/identity-file.json"
\ No newline at end of file
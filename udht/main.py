@@ -5,9 +5,13 @@ from utils import get_logger
 from core.DHTService import DHTService
 from typing import List
 from core.Peer import Peer
+from core.MessageStream import MessageStream
 from queue import Queue
 from socket import *
+import selectors
 import threading
+import pickle
+import struct
 import globals
 
 class Server:
@@ -20,6 +24,10 @@ class Server:
         UPDATE_PEER=6
         GET_PEER=7
         SEND_IDENTITY=8
+        GET_CHANGES=9
+        BATCH=10
+        GET_STATS=11
+        FIND_PEERS=12
         
     class ServerMessage():
         class MessageAction(Enum):
@@ -28,6 +36,10 @@ class Server:
             UPDATE_PEER="peer update"
             GET_PEER="peer get"
             SEND_IDENTITY="peer id"
+            GET_CHANGES="peer changes"
+            BATCH="peer batch"
+            GET_STATS="stats"
+            FIND_PEERS="peer find"
         class MessageResult(Enum):
             ERROR="error"    
             COMPLETED="completed"
@@ -44,7 +56,7 @@ class Server:
         self.logger                                     = get_logger("ServerLogger")
         self.dht_service                                = dht_service
         self.__consumers                                = globals.CONSUMERS_QUANTITY
-        self.__client_list: List[threading.Thread]      = list()
+        self.__selector                                 = selectors.DefaultSelector()
         self.__consumers_list: List[threading.Thread]   = list()
         self.__server_address                           = (host, port)
         self.__socket                                   = socket(AF_INET, SOCK_STREAM)
@@ -87,57 +99,103 @@ class Server:
                 file.write(json.dumps(peer.serialize()))
                 self.dht_service.create_peer(self.__identity)
         
+        self.__serve()
+        
+    ## a single selector loop reads every connection, each one keeps its own MessageStream
+    ## so partial messages wait in its buffer, and complete messages go to the consumers.
+    ## Connection sockets stay blocking, they are only read once the selector reports them
+    ## readable and consumers can write large responses with sendall
+    def __serve(self) -> None:
+        self.__socket.setblocking(False)
+        self.__selector.register(self.__socket, selectors.EVENT_READ, None)
         while True:
+            for key, _ in self.__selector.select():
+                if key.data is None:
+                    self.__accept()
+                else:
+                    self.__read(key.fileobj, *key.data)
+    
+    def __accept(self) -> None:
+        try:
             connection, address = self.__socket.accept()
-            client_thread = threading.Thread(target=self.__handle_client, args=(connection, address))
-            self.__client_list.append(client_thread)
-            client_thread.start()
+        except BlockingIOError:
+            return
+        connection.setblocking(True)
+        self.__selector.register(connection, selectors.EVENT_READ, (MessageStream(connection), address))
         
-    def __handle_client(self, connection: socket, address: tuple) -> None:
-        alive=True
-        while alive:
-            try:
-                bin = connection.recv(1024)
-                self.logger.info(f"(*) received {bin} from {address} size: {len(bin)}")
-                messages:list[bytes] = bin.split(b"\n")
-                for data in messages:
-                    if len(data) > 2:
-                        data = data.decode(globals.BASIC_DECODER)
-                        self.logger.info(f"(*) Decoded message {data}")
-                        data: dict = json.loads(data)
-                        message_type = int(data.get("message_type", -1))
-                        bdata = data.get("data", dict())
-                        if message_type == Server.ClientState.CLOSE.value:   
-                            alive=False
-                            connection.close()
-                            self.logger.info(f"(*) Clossing connection to {address}")
-                        else: 
-                            self.__queue.put((message_type, bdata, address, connection))
-                            self.logger.info(f"(*) {address} request code: {message_type} on queue")
-            except json.decoder.JSONDecodeError as e:
-                alive=False
-                connection.close()
-                self.logger.error(f"Invalid JSON data received from {address}: {e}")
-            except Exception as e:
-                connection.close()
-                alive = False
-                self.logger.error(f"Unexpected error handling client {address}: {e}")
+    def __read(self, connection: socket, stream: MessageStream, address: tuple) -> None:
+        try:
+            messages = stream.read()
+            if messages is None:
+                self.logger.info(f"(*) {address} closed the connection")
+                self.__drop(connection)
+                return
+            for data in messages:
+                self.logger.debug("(*) Decoded message %s from %s", data, address)
+                message_type = int(data.get("message_type", -1))
+                bdata = data.get("data", dict())
+                if message_type == Server.ClientState.CLOSE.value:   
+                    self.logger.info(f"(*) Clossing connection to {address}")
+                    self.__drop(connection)
+                    return
+                self.__queue.put((message_type, bdata, address, connection))
+                self.logger.debug("(*) %s request code: %s on queue", address, message_type)
+        except json.decoder.JSONDecodeError as e:
+            self.__drop(connection)
+            self.logger.error(f"Invalid JSON data received from {address}: {e}")
+        except Exception as e:
+            self.__drop(connection)
+            self.logger.error(f"Unexpected error handling client {address}: {e}")
+    
+    def __drop(self, connection: socket) -> None:
+        self.__selector.unregister(connection)
+        connection.close()
+    
+    ## consumers never close a socket the selector still holds, shutting it down makes it
+    ## readable at EOF and the loop drops it
+    def __abort(self, connection: socket) -> None:
+        try:
+            connection.shutdown(SHUT_RDWR)
+        except OSError:
+            pass
             
+    ## the table goes out as a sequence of frames, a 4 byte big-endian length followed by a
+    ## pickled { "peers": {...}, "cursor": next | None, "epoch", "version" } page. The client
+    ## reads frames until the cursor is None and may resume after the cursor, the last peer
+    ## id it received, with data { "cursor", "page_size" }
+    def __send_hash_table(self, connection: socket, data: dict) -> None:
+        page_size = min(max(int(data.get("page_size", globals.HASH_TABLE_PAGE_SIZE)), 1), globals.HASH_TABLE_MAX_PAGE_SIZE)
+        cursor = data.get("cursor", None)
+        ## taken before the snapshot, changes racing the stream are delivered again by GET_CHANGES
+        epoch, version = self.dht_service.get_version()
+        for peers, next_cursor in self.dht_service.iter_hash_table(page_size, cursor):
+            frame = pickle.dumps({ "peers": peers, "cursor": next_cursor, "epoch": epoch, "version": version }, protocol=pickle.HIGHEST_PROTOCOL)
+            connection.sendall(struct.pack(">I", len(frame)) + frame)
+
+    ## peers registered on ip and/or under name, both given narrows to peers matching both
+    def __find_peers(self, ip: str, name: str) -> list[dict]:
+        if ip:
+            peers = self.dht_service.get_peers_by_ip(ip)
+            return [ peer for peer in peers if peer["name"] == name ] if name else peers
+        if name:
+            return self.dht_service.get_peers_by_name(name)
+        return list()
+
     def __create_consumers(self) -> None:
         def consumer() -> None:
             while True:
                 message_type, data, address, connection = self.__queue.get()
                 if message_type == Server.ClientState.SEND_HASH_TABLE.value:
-                    self.logger.info(f"(*) {address} request: sending hash-table without code")
-                    result = self.dht_service.get_hash_table()
-                    connection.sendall(result)
+                    self.logger.info(f"(*) {address} request: streaming hash-table")
+                    try:
+                        self.__send_hash_table(connection, data)
+                    except (OSError, TypeError, ValueError) as e:
+                        self.logger.error(f"Hash-table stream to {address} interrupted: {e}")
+                        self.__abort(connection)
                 else:
                     message = Server.ServerMessage()
                     peer_id = data.get("peer_id", "")
-                    ip = data.get("ip", "")
-                    name = data.get("name", "")
-                    ports = data.get("ports", "")
-                    peer = Peer(ip=ip, name=name, ports=ports, peer_id=peer_id)
+                    peer = Server.to_peer(data)
                     try:
                         result = False
                         if message_type == Server.ClientState.REMOVE_PEER.value:
@@ -147,7 +205,7 @@ class Server:
                         elif message_type == Server.ClientState.SEND_IDENTITY.value:
                             message.action = Server.ServerMessage.MessageAction.SEND_IDENTITY
                             result = self.__identity.serialize()
-                            self.logger.info(f"(*) {address} request: sending identity: {result}")
+                            self.logger.debug("(*) %s request: sending identity: %s", address, result)
                         elif message_type == Server.ClientState.ADD_PEER.value:
                             message.action = Server.ServerMessage.MessageAction.ADD_PEER
                             result = self.dht_service.create_peer(peer)
@@ -156,7 +214,28 @@ class Server:
                         elif message_type == Server.ClientState.GET_PEER.value:
                             message.action = Server.ServerMessage.MessageAction.GET_PEER
                             result: dict[str, str] = self.dht_service.get_peer(peer_id)
-                            self.logger.info(f"(*) {address} request: getting peer result: {peer} ")
+                            self.logger.debug("(*) %s request: getting peer result: %s", address, result)
+                            message.data = result
+                        elif message_type == Server.ClientState.GET_CHANGES.value:
+                            message.action = Server.ServerMessage.MessageAction.GET_CHANGES
+                            result = self.dht_service.get_changes(data.get("epoch", ""), int(data.get("version", 0)))
+                            self.logger.info(f"(*) {address} request: changes since {data.get('version', 0)} resync: {result['resync']} peers: {len(result['peers'])} removed: {len(result['removed'])}")
+                            message.data = result
+                        elif message_type == Server.ClientState.BATCH.value:
+                            message.action = Server.ServerMessage.MessageAction.BATCH
+                            operations = [ (operation.get("op", ""), Server.to_peer(operation.get("data", dict()))) for operation in data.get("operations", list()) ]
+                            result = self.dht_service.apply_batch(operations)
+                            self.logger.info(f"(*) {address} request: batch of {len(result)} operations applied: {sum(result)}")
+                            message.data = result
+                        elif message_type == Server.ClientState.GET_STATS.value:
+                            message.action = Server.ServerMessage.MessageAction.GET_STATS
+                            result = self.dht_service.get_stats()
+                            self.logger.info(f"(*) {address} request: stats {result}")
+                            message.data = result
+                        elif message_type == Server.ClientState.FIND_PEERS.value:
+                            message.action = Server.ServerMessage.MessageAction.FIND_PEERS
+                            result = self.__find_peers(data.get("ip", ""), data.get("name", ""))
+                            self.logger.info(f"(*) {address} request: finding peers ip: {data.get('ip', '')} name: {data.get('name', '')} found: {len(result)}")
                             message.data = result
                         elif message_type == Server.ClientState.UPDATE_PEER.value:
                             message.action = Server.ServerMessage.MessageAction.UPDATE_PEER
@@ -166,17 +245,25 @@ class Server:
                         message.result = Server.ServerMessage.MessageResult.COMPLETED if result else Server.ServerMessage.MessageResult.ERROR
                     except Exception as e:
                         message.result = message.MessageResult.ERROR
-                    message = json.dumps(message.to_dict()).encode(globals.BASIC_DECODER)
+                    message = json.dumps(message.to_dict()).encode(globals.BASIC_DECODER) + b"\n"
                     try:
                         connection.sendall(message)
-                    except BrokenPipeError as e:
+                    except OSError as e:
                         self.logger.error("Clossing connection --resolution: broken-pipe: client must closed the client-connection")
-                        connection.close()
+                        self.__abort(connection)
         for _ in range(self.__consumers):
             consumer_thread = threading.Thread(target=consumer)
             self.__consumers_list.append(consumer_thread)
             consumer_thread.start()
 
+    @staticmethod
+    def to_peer(data: dict) -> Peer:
+        return Peer(ip=data.get("ip", ""), name=data.get("name", ""), ports=data.get("ports", ""), peer_id=data.get("peer_id", ""))
+
 if __name__ == "__main__":
-    server = Server(port=globals.PORT, host=globals.HOST, dht_service=globals.injector.get(DHTService))
-    server.start()
+    dht_service = globals.injector.get(DHTService)
+    server = Server(port=globals.PORT, host=globals.HOST, dht_service=dht_service)
+    try:
+        server.start()
+    finally:
+        dht_service.close()
@@ -1,18 +1,33 @@
-
+import atexit
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+LOG_FILE = "logs/server.log"
 
+_listener: QueueListener | None = None
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_lock = threading.Lock()
 
+## Loggers only put records on a queue, a single listener thread owns the rotating file
+## handler and does the writing. Asking for the same logger twice returns it untouched
+## instead of stacking another handler on it
 def get_logger(name: str) -> logging.Logger:
-    os.makedirs("logs", exist_ok=True)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    global _listener
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    handler = TimedRotatingFileHandler("logs/server.log", when="midnight", interval=1)
-    handler.suffix = "%Y-%m-%d" 
-    handler.setLevel(logging.DEBUG)
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    with _lock:
+        if _listener is None:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            handler = TimedRotatingFileHandler(LOG_FILE, when="midnight", interval=1)
+            handler.suffix = "%Y-%m-%d"
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            _listener = QueueListener(_queue, handler)
+            _listener.start()
+            atexit.register(_listener.stop)
+        if not any(isinstance(handler, QueueHandler) for handler in logger.handlers):
+            logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+            logger.addHandler(QueueHandler(_queue))
+            logger.propagate = False
     return logger
-